@@ -0,0 +1,107 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+TOKEN_CACHE_KEY = 'auth_token:{}'
+USER_FIELDS = (
+    'id', 'email', 'username', 'first_name', 'last_name',
+    'is_active', 'is_staff', 'is_superuser'
+)
+
+
+class TokenCache:
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return None
+            user, expires = item
+            if expires < time.monotonic():
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+            return user
+
+    def set(self, key, user):
+        with self.lock:
+            self.items[key] = (user, time.monotonic() + self.timeout)
+            self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+    def delete(self, keys):
+        with self.lock:
+            for key in keys:
+                self.items.pop(key, None)
+
+
+token_cache = TokenCache(
+    settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TIMEOUT
+)
+
+
+def shared_cache_key(key):
+    return TOKEN_CACHE_KEY.format(hashlib.sha256(key.encode()).hexdigest())
+
+
+def delete_tokens(keys):
+    token_cache.delete(keys)
+    if settings.TOKEN_CACHE_SHARED:
+        cache.delete_many([shared_cache_key(key) for key in keys])
+
+
+def invalidate_tokens(keys):
+    keys = list(keys)
+    delete_tokens(keys)
+    transaction.on_commit(lambda: delete_tokens(keys))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def load_user(self, key):
+        if settings.TOKEN_CACHE_SHARED:
+            user = cache.get(shared_cache_key(key))
+            if user is not None:
+                return user
+        try:
+            token = (
+                self.get_model().objects
+                .select_related('user')
+                .only('key', 'user', *(f'user__{f}' for f in USER_FIELDS))
+                .get(key=key)
+            )
+        except self.get_model().DoesNotExist:
+            raise AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        if settings.TOKEN_CACHE_SHARED:
+            cache.set(
+                shared_cache_key(key), token.user,
+                settings.TOKEN_CACHE_TIMEOUT
+            )
+        return token.user
+
+    def authenticate_credentials(self, key):
+        if settings.TOKEN_CACHE_SHARED:
+            user = self.load_user(key)
+        else:
+            user = token_cache.get(key)
+            if user is None:
+                user = self.load_user(key)
+                token_cache.set(key, user)
+        user = copy.copy(user)
+        return user, self.get_model()(key=key, user=user)
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from drf_extra_fields.fields import Base64ImageField
+from rest_framework import serializers
+
+from api.serializers.fast import recipe_image
+from recipes.images import content_name
+
+
+class HashedBase64ImageField(Base64ImageField):
+    default_error_messages = {
+        'too_large': 'Размер картинки не должен превышать {max_size} байт.',
+    }
+
+    def get_file_name(self, decoded_file):
+        return content_name(decoded_file)
+
+    def to_internal_value(self, data):
+        max_size = settings.IMAGE_UPLOAD_MAX_SIZE
+        if isinstance(data, str) and len(data) * 3 // 4 > max_size:
+            self.fail('too_large', max_size=max_size)
+        image = super().to_internal_value(data)
+        model_field = self.parent.Meta.model._meta.get_field(self.source)
+        name = model_field.generate_filename(None, image.name)
+        if default_storage.exists(name):
+            return name
+        return image
+
+
+class RecipeImageField(serializers.ImageField):
+    def __init__(self, rendition=None, many_rendition=None, **kwargs):
+        self.rendition = rendition
+        self.many_rendition = many_rendition
+        kwargs.update(source='*', read_only=True)
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        rendition = self.rendition
+        if self.many_rendition and isinstance(
+            self.parent.parent, serializers.ListSerializer
+        ):
+            rendition = self.many_rendition
+        return super().to_representation(recipe_image(recipe, rendition))
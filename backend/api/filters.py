@@ -1,6 +1,25 @@
+from django import forms
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
 
+from recipes.cache import get_tag_map
 from recipes.models import Ingredient, Recipe, Tag
+from recipes.ranking import RECIPE_ORDERINGS
+from recipes.search import search_recipes
+
+TAGS_MATCH_ANY = 'any'
+TAGS_MATCH_ALL = 'all'
+
+
+class SlugListField(forms.Field):
+    widget = forms.SelectMultiple
+
+    def to_python(self, value):
+        return [slug for slug in value or () if slug]
+
+
+class SlugListFilter(filters.Filter):
+    field_class = SlugListField
 
 
 class IngredientsFilter(FilterSet):
@@ -20,15 +39,52 @@ class TagsFilter(FilterSet):
 
 
 class RecipesFilter(FilterSet):
-    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    tags = SlugListFilter(method='filter_tags')
+    tags_match = filters.ChoiceFilter(
+        choices=((TAGS_MATCH_ANY, TAGS_MATCH_ANY),
+                 (TAGS_MATCH_ALL, TAGS_MATCH_ALL)),
+        method='filter_tags_match'
+    )
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
+    search = filters.CharFilter(method='filter_search')
+    ordering = filters.ChoiceFilter(
+        choices=[(name, name) for name in RECIPE_ORDERINGS],
+        method='filter_ordering'
+    )
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'tags', 'tags_match', 'author',
+            'is_favorited', 'is_in_shopping_cart', 'search', 'ordering'
+        )
+
+    def filter_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        tag_map = get_tag_map()
+        tag_ids = {tag_map[slug] for slug in value if slug in tag_map}
+        match_all = self.form.cleaned_data.get('tags_match') == TAGS_MATCH_ALL
+        if not tag_ids or match_all and len(tag_ids) < len(set(value)):
+            return queryset.none()
+        recipe_tags = Recipe.tags.through.objects.filter(
+            recipe_id=OuterRef('pk')
+        )
+        if not match_all:
+            return queryset.filter(
+                Exists(recipe_tags.filter(tag_id__in=tag_ids))
+            )
+        for tag_id in tag_ids:
+            queryset = queryset.filter(
+                Exists(recipe_tags.filter(tag_id=tag_id))
+            )
+        return queryset
+
+    def filter_tags_match(self, queryset, name, value):
+        return queryset
 
     def filter_is_favorited(self, queryset, name, value):
         if value:
@@ -39,3 +95,11 @@ class RecipesFilter(FilterSet):
         if value:
             return queryset.filter(shopping_carts__user=self.request.user)
         return queryset
+
+    def filter_search(self, queryset, name, value):
+        if not value.strip():
+            return queryset
+        return search_recipes(queryset, value)
+
+    def filter_ordering(self, queryset, name, value):
+        return queryset.order_by(*RECIPE_ORDERINGS[value])
@@ -0,0 +1,98 @@
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+from api.serializers.fragments import (fragments_etag, get_recipe_fragments,
+                                       image_rendition, page_etag,
+                                       prefetch_subscriptions, render_recipe)
+from recipes.cache import get_version
+from recipes.models import Recipe
+
+CATALOG_CACHE_KEY = 'catalog:{}:{}:{}'
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def catalog_validators(model):
+    version = get_version(model)
+    return version, f'"{model._meta.model_name}-{version}"', version // 1000000
+
+
+def catalog_cache_key(model, version, request):
+    return CATALOG_CACHE_KEY.format(
+        model._meta.label_lower, version, request.get_full_path()
+    )
+
+
+def conditional_response(request, response, etag):
+    response['ETag'] = etag
+    not_modified = get_conditional_response(
+        request, etag=etag, response=response
+    )
+    return response if not_modified is None else not_modified
+
+
+class CatalogCacheMixin:
+    def cached_response(self, request, handler, *args, **kwargs):
+        model = self.queryset.model
+        version, etag, last_modified = catalog_validators(model)
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if not_modified is not None:
+            return not_modified
+
+        key = catalog_cache_key(model, version, request)
+        cached = cache.get(key)
+        if cached is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            cached = response.data
+            cache.set(key, cached, CATALOG_CACHE_TIMEOUT)
+        response = Response(cached)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, super().retrieve, *args, **kwargs
+        )
+
+
+class RecipeFragmentsMixin:
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(Recipe.objects.only(
+            'id', 'pub_date', 'popularity_score', 'trending_score'
+        ))
+        page = self.paginate_queryset(queryset)
+        fragments = get_recipe_fragments([recipe.id for recipe in page])
+        context = self.get_serializer_context()
+        prefetch_subscriptions(fragments, context)
+        rendition = image_rendition(self.get_serializer_class(), True)
+        response = self.get_paginated_response([
+            render_recipe(fragment, context, rendition)
+            for fragment in fragments
+        ])
+        return conditional_response(
+            request, response,
+            page_etag(fragments, context, request, response.data)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = str(kwargs[self.lookup_url_kwarg or self.lookup_field])
+        fragments = get_recipe_fragments([int(pk)]) if pk.isdigit() else []
+        if not fragments:
+            raise NotFound()
+        context = self.get_serializer_context()
+        rendition = image_rendition(self.get_serializer_class(), False)
+        return conditional_response(
+            request,
+            Response(render_recipe(fragments[0], context, rendition)),
+            fragments_etag(fragments, context, request.build_absolute_uri())
+        )
@@ -1,6 +1,150 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+import math
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as DecodeError
+from functools import reduce
+from operator import and_, or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from recipes.ranking import RECIPE_ORDERINGS
+
+
+def valid_cursor_value(value):
+    if isinstance(value, float):
+        return math.isfinite(value)
+    return value is not None
+
+
+class KeysetPagination(BasePagination):
+    page_size = 6
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering = ('-id',)
+    invalid_cursor_message = 'Некорректный курсор.'
+
+    def get_page_size(self, request):
+        page_size = request.query_params.get(self.page_size_query_param, '')
+        if page_size.isdigit() and int(page_size) > 0:
+            return min(int(page_size), self.max_page_size)
+        return self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(urlsafe_b64decode(encoded.encode()))
+        except (DecodeError, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or (
+            len(position) != len(self.ordering)
+        ) or not all(isinstance(value, str) for value in position):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def parse_cursor(self, queryset, position):
+        fields = [field.lstrip('-') for field in self.ordering]
+        try:
+            values = [
+                queryset.model._meta.get_field(field).to_python(value)
+                for field, value in zip(fields, position)
+            ]
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+        if not all(map(valid_cursor_value, values)):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def encode_cursor(self, instance):
+        position = [
+            str(getattr(instance, field.lstrip('-')))
+            for field in self.ordering
+        ]
+        return urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def filter_after(self, queryset, position):
+        fields = [field.lstrip('-') for field in self.ordering]
+        conditions = []
+        for index, field in enumerate(fields):
+            lookup = 'lt' if self.ordering[index].startswith('-') else 'gt'
+            equal = [Q(**{fields[i]: position[i]}) for i in range(index)]
+            conditions.append(reduce(
+                and_, equal, Q(**{f'{field}__{lookup}': position[index]})
+            ))
+        return queryset.filter(reduce(or_, conditions))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = self.filter_after(
+                queryset, self.parse_cursor(queryset, position)
+            )
+        page = list(queryset[:page_size + 1])
+        self.next_cursor = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_cursor = self.encode_cursor(page[-1])
+        return page
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param, self.next_cursor
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+
+class RecipesKeysetPagination(KeysetPagination):
+    ordering = ('-pub_date', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.ordering = RECIPE_ORDERINGS.get(
+            request.query_params.get('ordering'), self.ordering
+        )
+        return super().paginate_queryset(queryset, request, view)
 
 
 class CustomPageNumberPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = 'limit'
+    keyset_pagination_class = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_pagination_class is not None and (
+            self.keyset_pagination_class.cursor_query_param
+            in request.query_params
+        ):
+            self.keyset = self.keyset_pagination_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class RecipesPagination(CustomPageNumberPagination):
+    keyset_pagination_class = RecipesKeysetPagination
+
+
+class FollowsPagination(CustomPageNumberPagination):
+    keyset_pagination_class = KeysetPagination
@@ -0,0 +1,47 @@
+from operator import attrgetter
+
+USER_FIELDS = ('email', 'id', 'username', 'first_name', 'last_name')
+TAG_FIELDS = ('id', 'name', 'color', 'slug')
+INGREDIENT_FIELDS = ('id', 'name', 'measurement_unit')
+
+get_user_fields = attrgetter(*USER_FIELDS)
+get_tag_fields = attrgetter(*TAG_FIELDS)
+get_ingredient_fields = attrgetter(*INGREDIENT_FIELDS)
+
+
+def absolute_url(url, request):
+    if url is None or request is None:
+        return url
+    return request.build_absolute_uri(url)
+
+
+def file_url(file, request):
+    if not file:
+        return None
+    return absolute_url(file.url, request)
+
+
+def recipe_image(recipe, rendition=None):
+    if rendition:
+        return getattr(recipe, f'image_{rendition}') or recipe.image
+    return recipe.image
+
+
+def user_data(user, is_subscribed):
+    data = dict(zip(USER_FIELDS, get_user_fields(user)))
+    data['is_subscribed'] = is_subscribed
+    return data
+
+
+def tags_data(tags):
+    return [dict(zip(TAG_FIELDS, get_tag_fields(tag))) for tag in tags]
+
+
+def ingredients_data(lines):
+    return [
+        dict(
+            zip(INGREDIENT_FIELDS, get_ingredient_fields(line.ingredient)),
+            amount=line.amount
+        )
+        for line in lines
+    ]
@@ -0,0 +1,99 @@
+import hashlib
+import time
+
+from api.serializers.fast import (USER_FIELDS, absolute_url, file_url,
+                                  get_user_fields, ingredients_data,
+                                  recipe_image, tags_data)
+from api.serializers.users import subscriptions
+from recipes.fragments import get_fragments
+from recipes.images import RENDITIONS
+from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.personalization import get_recipe_ids
+
+
+def user_recipe_ids(model, context):
+    key = f'{model._meta.model_name}_ids'
+    if key not in context:
+        context[key] = get_recipe_ids(model, context.get('request').user)
+    return context[key]
+
+
+def recipe_fragment(recipe):
+    return {
+        'version': time.time_ns() // 1000,
+        'id': recipe.id,
+        'tags': tags_data(recipe.tags.all()),
+        'author': dict(zip(USER_FIELDS, get_user_fields(recipe.author))),
+        'ingredients': ingredients_data(recipe.recipe_ingredient.all()),
+        'name': recipe.name,
+        'images': {
+            rendition: file_url(recipe_image(recipe, rendition), None)
+            for rendition in (None, *RENDITIONS)
+        },
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+    }
+
+
+def build_fragments(ids):
+    return map(
+        recipe_fragment, Recipe.objects.with_related().filter(id__in=ids)
+    )
+
+
+def get_recipe_fragments(ids):
+    return get_fragments(ids, build_fragments)
+
+
+def prefetch_subscriptions(fragments, context):
+    subscriptions(
+        [fragment['author']['id'] for fragment in fragments], context
+    )
+
+
+def recipe_flags(fragment, context):
+    author_id = fragment['author']['id']
+    return (
+        subscriptions((author_id,), context)[author_id],
+        fragment['id'] in user_recipe_ids(Favorite, context),
+        fragment['id'] in user_recipe_ids(ShoppingCart, context),
+    )
+
+
+def render_recipe(fragment, context, rendition=None):
+    subscribed, favorited, in_shopping_cart = recipe_flags(fragment, context)
+    return {
+        'id': fragment['id'],
+        'tags': fragment['tags'],
+        'author': dict(fragment['author'], is_subscribed=subscribed),
+        'ingredients': fragment['ingredients'],
+        'is_favorited': favorited,
+        'is_in_shopping_cart': in_shopping_cart,
+        'name': fragment['name'],
+        'image': absolute_url(
+            fragment['images'][rendition], context.get('request')
+        ),
+        'text': fragment['text'],
+        'cooking_time': fragment['cooking_time'],
+    }
+
+
+def fragments_etag(fragments, context, *parts):
+    state = [
+        (fragment['id'], fragment['version'], recipe_flags(fragment, context))
+        for fragment in fragments
+    ]
+    digest = hashlib.md5(repr((parts, state)).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def page_etag(fragments, context, request, data):
+    meta = {key: value for key, value in data.items() if key != 'results'}
+    return fragments_etag(
+        fragments, context, request.build_absolute_uri(), meta
+    )
+
+
+def image_rendition(serializer_class, many):
+    image = serializer_class._declared_fields['image']
+    return image.many_rendition if many else image.rendition
@@ -1,9 +1,22 @@
-from drf_extra_fields.fields import Base64ImageField
+from functools import partial
+
+from django.db import transaction
 from rest_framework import serializers
 
+from api.fields import HashedBase64ImageField, RecipeImageField
+from api.serializers.fragments import (recipe_fragment, render_recipe,
+                                       user_recipe_ids)
 from api.serializers.users import UserSerializer
+from recipes.cache import get_tag_map
+from recipes.fragments import invalidate_recipe_fragments
+from recipes.images import schedule_renditions
+from recipes.matching import record_recipe_changes
 from recipes.models import (Favorite, Ingredient, IngredientQuantity, Recipe,
                             ShoppingCart, Tag)
+from recipes.search import update_search_vectors
+from recipes.shopping_cart import invalidate_recipe_shopping_carts
+
+BATCH_MAX_SIZE = 100
 
 
 class IngredientsSerializer(serializers.ModelSerializer):
@@ -39,6 +52,7 @@ class RecipesSerializer(serializers.ModelSerializer):
     )
     is_favorited = serializers.SerializerMethodField(read_only=True)
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
+    image = RecipeImageField(many_rendition='medium')
 
     class Meta:
         model = Recipe
@@ -47,30 +61,23 @@ class RecipesSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time'
         )
 
-    def get_ingredients(self, obj):
-        ingredients = IngredientQuantity.objects.filter(recipe=obj)
-        return IngredientQuantitysSerializer(ingredients, many=True).data
-
     def get_is_favorited(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return user.favorites.filter(recipe=obj).exists()
+        return obj.id in user_recipe_ids(Favorite, self.context)
 
     def get_is_in_shopping_cart(self, obj):
-        request = self.context.get('request')
-        if request is None or request.user.is_authenticated:
-            return ShoppingCart.objects.filter(
-                user=request.user,
-                recipe=obj
-            ).exists()
-        return False
+        return obj.id in user_recipe_ids(ShoppingCart, self.context)
+
+    def to_representation(self, instance):
+        rendition = self.fields['image'].rendition
+        if isinstance(self.parent, serializers.ListSerializer):
+            rendition = self.fields['image'].many_rendition
+        return render_recipe(
+            recipe_fragment(instance), self.context, rendition
+        )
 
 
 class IngredientCreateSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all()
-    )
+    id = serializers.IntegerField()
     amount = serializers.IntegerField()
 
     class Meta:
@@ -79,12 +86,10 @@ class IngredientCreateSerializer(serializers.ModelSerializer):
 
 
 class RecipesCreateSerializer(serializers.ModelSerializer):
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(), many=True
-    )
+    tags = serializers.ListField(child=serializers.IntegerField())
     ingredients = IngredientCreateSerializer(many=True)
     author = UserSerializer(read_only=True)
-    image = Base64ImageField()
+    image = HashedBase64ImageField()
 
     class Meta:
         model = Recipe
@@ -99,32 +104,38 @@ class RecipesCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({
                 'ingredients': 'Нужно выбрать хотя бы один ингредиент!'
             })
-        ingredients_list = []
-        for ingredient in ingredients:
-            ingredient_id = ingredient['id']
-            if ingredient_id in ingredients_list:
-                raise serializers.ValidationError({
-                    'ingredients': 'Ингредиенты должны быть уникальными!'
-                })
-            ingredients_list.append(ingredient_id)
-            amount = ingredient['amount']
-            if int(amount) <= 0:
-                raise serializers.ValidationError({
-                    'amount': 'Количество ингредиента должно быть больше нуля!'
-                })
+        ingredient_ids = {ingredient['id'] for ingredient in ingredients}
+        if len(ingredient_ids) != len(ingredients):
+            raise serializers.ValidationError({
+                'ingredients': 'Ингредиенты должны быть уникальными!'
+            })
+        if any(int(ingredient['amount']) <= 0 for ingredient in ingredients):
+            raise serializers.ValidationError({
+                'amount': 'Количество ингредиента должно быть больше нуля!'
+            })
+        missing = ingredient_ids - set(
+            Ingredient.objects.filter(id__in=ingredient_ids)
+            .values_list('id', flat=True)
+        )
+        if missing:
+            raise serializers.ValidationError({
+                'ingredients': f'Ингредиенты не найдены: {sorted(missing)}'
+            })
 
         tags = data['tags']
         if not tags:
             raise serializers.ValidationError({
                 'tags': 'Нужно выбрать хотя бы один тэг!'
             })
-        tags_list = []
-        for tag in tags:
-            if tag in tags_list:
-                raise serializers.ValidationError({
-                    'tags': 'Тэги должны быть уникальными!'
-                })
-            tags_list.append(tag)
+        if len(set(tags)) != len(tags):
+            raise serializers.ValidationError({
+                'tags': 'Тэги должны быть уникальными!'
+            })
+        missing = set(tags) - set(get_tag_map().values())
+        if missing:
+            raise serializers.ValidationError({
+                'tags': f'Тэги не найдены: {sorted(missing)}'
+            })
 
         cooking_time = self.initial_data.get('cooking_time')
         if int(cooking_time) <= 0:
@@ -138,16 +149,50 @@ class RecipesCreateSerializer(serializers.ModelSerializer):
         IngredientQuantity.objects.bulk_create(
             IngredientQuantity(
                 recipe=recipe,
-                ingredient=ingredient['id'],
+                ingredient_id=ingredient['id'],
                 amount=ingredient['amount']
             )
             for ingredient in ingredients
         )
 
     def create_tags(self, tags, recipe):
-        for tag in tags:
-            recipe.tags.add(tag)
+        recipe_tags = Recipe.tags.through
+        recipe_tags.objects.bulk_create(
+            recipe_tags(recipe=recipe, tag_id=tag_id) for tag_id in tags
+        )
 
+    def update_ingredients(self, ingredients, recipe):
+        amounts = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        current = {
+            line.ingredient_id: line
+            for line in IngredientQuantity.objects.filter(recipe=recipe)
+        }
+        removed = current.keys() - amounts.keys()
+        added = [
+            {'id': ingredient_id, 'amount': amount}
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in current
+        ]
+        changed = []
+        for ingredient_id, line in current.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and amount != line.amount:
+                line.amount = amount
+                changed.append(line)
+        if removed:
+            IngredientQuantity.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+        if changed:
+            IngredientQuantity.objects.bulk_update(changed, ('amount',))
+        if added:
+            self.create_ingredients(added, recipe)
+        return bool(removed or changed or added)
+
+    @transaction.atomic
     def create(self, validated_data):
         author = self.context.get('request').user
         tags = validated_data.pop('tags')
@@ -155,27 +200,55 @@ class RecipesCreateSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(author=author, **validated_data)
         self.create_tags(tags, recipe)
         self.create_ingredients(ingredients, recipe)
+        transaction.on_commit(partial(schedule_renditions, recipe.id))
+        transaction.on_commit(partial(record_recipe_changes, (recipe.id,)))
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
 
-        IngredientQuantity.objects.filter(recipe=instance).delete()
-
         instance.tags.set(tags)
-        self.create_ingredients(ingredients, instance)
-
-        return super().update(instance, validated_data)
+        transaction.on_commit(
+            partial(invalidate_recipe_fragments, (instance.id,))
+        )
+        if self.update_ingredients(ingredients, instance):
+            transaction.on_commit(
+                partial(invalidate_recipe_shopping_carts, instance.id)
+            )
+            transaction.on_commit(
+                partial(update_search_vectors, (instance.id,))
+            )
+            transaction.on_commit(
+                partial(record_recipe_changes, (instance.id,))
+            )
+        if 'image' in validated_data:
+            transaction.on_commit(partial(schedule_renditions, instance.id))
+
+        changed = [
+            field for field, value in validated_data.items()
+            if getattr(instance, field) != value
+        ]
+        for field in changed:
+            setattr(instance, field, validated_data[field])
+        if changed:
+            instance.save(update_fields=changed)
+        return instance
 
     def to_representation(self, instance):
         request = self.context.get('request')
         context = {'request': request}
+        instance = (
+            Recipe.objects.with_related().get(pk=instance.pk)
+        )
         return RecipesSerializer(
             instance, context=context).data
 
 
 class RecipeRepresentationSerializer(serializers.ModelSerializer):
+    image = RecipeImageField(rendition='thumbnail')
+
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
@@ -203,3 +276,22 @@ class ShoppingCartsSerializer(serializers.ModelSerializer):
         context = {'request': request}
         return RecipeRepresentationSerializer(
             instance.recipe, context=context).data
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BATCH_MAX_SIZE
+    )
+
+
+class RecipeMatchSerializer(serializers.Serializer):
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BATCH_MAX_SIZE
+    )
+    min_coverage = serializers.FloatField(
+        min_value=0, max_value=1, default=0
+    )
@@ -1,10 +1,29 @@
+from django.db.models import Manager
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
 
+from api.fields import RecipeImageField
+from api.serializers.fast import user_data
 from recipes.models import Recipe
+from users.follow_graph import is_subscribed
 from users.models import Follow, User
 
 
+def subscriptions(author_ids, context):
+    flags = context.setdefault('subscriptions', {})
+    missing = [pk for pk in author_ids if pk not in flags]
+    if missing:
+        flags.update(is_subscribed(context.get('request').user, missing))
+    return flags
+
+
+class UserListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        users = list(data.all() if isinstance(data, Manager) else data)
+        subscriptions([user.id for user in users], self.context)
+        return super().to_representation(users)
+
+
 class UserCreateSerializer(UserCreateSerializer):
     class Meta:
         model = User
@@ -20,16 +39,18 @@ class UserSerializer(UserSerializer):
             'email', 'id', 'username',
             'first_name', 'last_name', 'is_subscribed'
         )
+        list_serializer_class = UserListSerializer
 
     def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return Follow.objects.filter(
-            user=user, following=obj).exists()
+        return subscriptions((obj.id,), self.context)[obj.id]
+
+    def to_representation(self, instance):
+        return user_data(instance, self.get_is_subscribed(instance))
 
 
 class FollowRecipesSerializer(serializers.ModelSerializer):
+    image = RecipeImageField(rendition='thumbnail')
+
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
@@ -54,21 +75,19 @@ class FollowsSerializer(serializers.ModelSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        if request.user.is_anonymous:
-            return Follow.objects.filter(
-                user=request.user, following=obj).exists()
-        return False
+        return obj.user_id == self.context.get('request').user.id
 
     def get_recipes(self, obj):
         request = self.context.get('request')
         context = {'request': request}
-        recipes = Recipe.objects.filter(author=obj.following)
-        limit = request.GET.get('recipes_limit')
-        if limit:
-            recipes = recipes[:int(limit)]
+        recipes = getattr(obj.following, 'limited_recipes', None)
+        if recipes is None:
+            recipes = Recipe.objects.filter(author=obj.following)
+            limit = request.query_params.get('recipes_limit', '')
+            if limit.isdigit():
+                recipes = recipes[:int(limit)]
         return FollowRecipesSerializer(
             recipes, many=True, context=context).data
 
     def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj.following).count()
+        return obj.following.recipes_count
@@ -0,0 +1,465 @@
+import json
+from base64 import urlsafe_b64encode
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from api.authentication import token_cache
+from recipes.matching import current_sequence
+from recipes.models import (Favorite, Ingredient, IngredientQuantity, Recipe,
+                            ShoppingCart, Tag)
+from recipes.ranking import (RECIPE_ORDERINGS, SCORE_HALF_LIVES,
+                             compute_scores)
+from recipes.shopping_cart import (get_shopping_cart_state, load_totals,
+                                   merge_units, shopping_cart_key)
+from users.models import Follow, User
+
+RECIPES_URL = '/api/recipes/'
+PAGE_SIZES = (3, 12)
+
+
+class RecipesTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(
+                email=f'user{number}@example.com',
+                username=f'user{number}',
+                first_name='Имя',
+                last_name='Фамилия',
+                password='Password-12345'
+            )
+            for number in range(3)
+        ]
+        tags = [
+            Tag.objects.create(
+                name=f'Тег {number}', color=f'#00000{number}',
+                slug=f'tag{number}'
+            )
+            for number in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г'
+            )
+            for number in range(5)
+        ]
+        for number in range(15):
+            recipe = Recipe.objects.create(
+                author=cls.users[number % 3],
+                name=f'Рецепт {number}',
+                text='Описание',
+                cooking_time=10,
+                image='recipes/image.png'
+            )
+            recipe.tags.set(tags[:number % 3 + 1])
+            IngredientQuantity.objects.bulk_create(
+                IngredientQuantity(
+                    recipe=recipe, ingredient=ingredient, amount=100
+                )
+                for ingredient in ingredients[:number % 5 + 1]
+            )
+            if number % 2:
+                Favorite.objects.create(user=cls.users[0], recipe=recipe)
+            if number % 3:
+                ShoppingCart.objects.create(user=cls.users[0], recipe=recipe)
+        Follow.objects.create(user=cls.users[0], following=cls.users[1])
+        cls.token = Token.objects.create(user=cls.users[0])
+
+    def setUp(self):
+        self.clear_caches()
+
+    def clear_caches(self):
+        cache.clear()
+        token_cache.items.clear()
+
+
+@override_settings(PROFILING_ENABLED=True, QUERY_BUDGET_RAISE=True)
+class RecipesQueryCountTests(RecipesTestCase):
+    def authenticate(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def count_queries(self, url, **params):
+        self.clear_caches()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response
+
+    def assert_page_queries(self, expected, **params):
+        for size in PAGE_SIZES:
+            with self.subTest(limit=size, **params):
+                self.clear_caches()
+                with self.assertNumQueries(expected):
+                    response = self.client.get(
+                        RECIPES_URL, {'limit': size, **params}
+                    )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()['results']), size)
+
+    def test_anonymous_list_queries(self):
+        self.assert_page_queries(5)
+
+    def test_authenticated_list_queries(self):
+        self.authenticate()
+        self.assert_page_queries(9)
+
+    def test_cursor_list_queries(self):
+        self.authenticate()
+        self.assert_page_queries(8, cursor='')
+
+    def test_list_queries_do_not_grow_with_page_size(self):
+        self.authenticate()
+        for params in ({}, {'cursor': ''}, {'is_favorited': 1}):
+            with self.subTest(**params):
+                counts = {
+                    self.count_queries(RECIPES_URL, limit=size, **params)[0]
+                    for size in PAGE_SIZES
+                }
+                self.assertEqual(len(counts), 1)
+
+    def test_list_flags(self):
+        self.authenticate()
+        response = self.client.get(RECIPES_URL, {'limit': 15})
+        for recipe in response.json()['results']:
+            number = int(recipe['name'].split()[-1])
+            self.assertEqual(recipe['is_favorited'], bool(number % 2))
+            self.assertEqual(recipe['is_in_shopping_cart'], bool(number % 3))
+            self.assertEqual(
+                recipe['author']['is_subscribed'],
+                recipe['author']['id'] == self.users[1].id
+            )
+            self.assertEqual(len(recipe['ingredients']), number % 5 + 1)
+
+    def test_query_budgets(self):
+        self.authenticate()
+        recipe = Recipe.objects.first()
+        for tag, url in (
+            ('RecipesViewSet.list', f'{RECIPES_URL}?cursor='),
+            ('RecipesViewSet.retrieve', f'{RECIPES_URL}{recipe.id}/'),
+            ('RecipesViewSet.download_shopping_cart',
+             f'{RECIPES_URL}download_shopping_cart/'),
+            ('UsersViewSet.subscriptions', '/api/users/subscriptions/'),
+            ('IngredientsViewSet.list', '/api/ingredients/'),
+            ('TagsViewSet.list', '/api/tags/'),
+        ):
+            with self.subTest(tag=tag):
+                queries, response = self.count_queries(url)
+                self.assertLessEqual(queries, settings.QUERY_BUDGETS[tag])
+
+
+class SerializerParityTests(RecipesTestCase):
+    def test_fast_serializers_match_drf(self):
+        for email in (None, self.users[1].email):
+            with self.subTest(email=email):
+                output = StringIO()
+                call_command(
+                    'check_serializers', email=email, pages=3, repeat=1,
+                    stdout=output
+                )
+                self.assertIn(
+                    'Ответы сериализаторов совпадают', output.getvalue()
+                )
+
+
+class BatchAddTests(RecipesTestCase):
+    def test_concurrent_insert_is_counted_once(self):
+        user = self.users[2]
+        recipes = list(Recipe.objects.order_by('id')[:2])
+        counts = [recipe.favorites_count for recipe in recipes]
+        bulk_create = Favorite.objects.bulk_create
+
+        def insert_concurrently(objs, **kwargs):
+            Favorite.objects.create(user=user, recipe=recipes[0])
+            return bulk_create(objs, **kwargs)
+
+        self.client.force_authenticate(user)
+        with mock.patch.object(
+            Favorite.objects, 'bulk_create', side_effect=insert_concurrently
+        ):
+            response = self.client.post(
+                f'{RECIPES_URL}favorite/',
+                {'recipes': [recipe.id for recipe in recipes]},
+                format='json'
+            )
+        self.assertEqual(response.json()['results'], [
+            {'id': recipes[0].id, 'status': 'exists'},
+            {'id': recipes[1].id, 'status': 'added'},
+        ])
+        for recipe in recipes:
+            recipe.refresh_from_db()
+        self.assertEqual(
+            [recipe.favorites_count - count
+             for recipe, count in zip(recipes, counts)],
+            [1, 1]
+        )
+
+
+class ListValidationErrorTests(RecipesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.users[0])
+
+    def test_invalid_list_element_returns_400(self):
+        for url, data, field, index in (
+            (f'{RECIPES_URL}favorite/', {'recipes': [1, 'x']}, 'recipes', '1'),
+            (RECIPES_URL, {
+                'name': 'Рецепт', 'text': 'Описание', 'cooking_time': 5,
+                'tags': ['abc'], 'ingredients': [],
+            }, 'tags', '0'),
+        ):
+            with self.subTest(url=url):
+                response = self.client.post(url, data, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(index, response.json()[field])
+
+
+class RecipeCursorTests(RecipesTestCase):
+    def test_non_finite_score_cursor_is_rejected(self):
+        for ordering in RECIPE_ORDERINGS:
+            for value in ('nan', 'inf', '-inf', 'NaN'):
+                cursor = urlsafe_b64encode(
+                    json.dumps([value, '1']).encode()
+                ).decode()
+                with self.subTest(ordering=ordering, value=value):
+                    response = self.client.get(
+                        RECIPES_URL, {'ordering': ordering, 'cursor': cursor}
+                    )
+                    self.assertEqual(response.status_code, 404)
+
+
+class RecipeUpdateTests(RecipesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.recipe = Recipe.objects.get(name='Рецепт 4')
+        self.client.force_authenticate(self.recipe.author)
+
+    def update_recipe(self):
+        line = self.recipe.recipe_ingredient.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f'{RECIPES_URL}{self.recipe.id}/', {
+                    'cooking_time': self.recipe.cooking_time,
+                    'tags': [self.recipe.tags.first().id],
+                    'ingredients': [
+                        {'id': line.ingredient_id, 'amount': 50},
+                    ],
+                },
+                format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.recipe.recipe_ingredient.count(), 1)
+
+    def test_removed_lines_refresh_search_once(self):
+        with mock.patch(
+            'api.serializers.recipes.update_search_vectors'
+        ) as serializer_update, mock.patch(
+            'recipes.signals.update_search_vectors'
+        ) as signal_update:
+            self.update_recipe()
+        self.assertEqual(serializer_update.call_count, 1)
+        self.assertEqual(signal_update.call_count, 0)
+
+    def test_removed_lines_record_one_match_change(self):
+        sequence = current_sequence()
+        self.update_recipe()
+        self.assertEqual(current_sequence(), sequence + 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'{RECIPES_URL}{self.recipe.id}/')
+        self.assertEqual(current_sequence(), sequence + 2)
+
+
+class RecipeTagsFilterTests(RecipesTestCase):
+    def filter_numbers(self, tags, **params):
+        response = self.client.get(
+            RECIPES_URL, {'tags': tags, 'limit': 15, **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        numbers = [
+            int(recipe['name'].split()[-1])
+            for recipe in response.json()['results']
+        ]
+        self.assertEqual(len(numbers), len(set(numbers)))
+        return set(numbers)
+
+    def test_filter_tags(self):
+        for tags, params, remainders in (
+            (['tag1', 'tag2'], {}, {1, 2}),
+            (['tag1', 'tag2'], {'tags_match': 'any'}, {1, 2}),
+            (['tag0', 'tag1', 'tag2'], {'tags_match': 'any'}, {0, 1, 2}),
+            (['tag1', 'tag2'], {'tags_match': 'all'}, {2}),
+            (['tag0', 'tag1', 'tag2'], {'tags_match': 'all'}, {2}),
+            (['tag2', 'unknown'], {'tags_match': 'any'}, {2}),
+            (['tag2', 'unknown'], {'tags_match': 'all'}, set()),
+            (['unknown'], {}, set()),
+        ):
+            with self.subTest(tags=tags, **params):
+                self.assertEqual(
+                    self.filter_numbers(tags, **params),
+                    {
+                        number for number in range(15)
+                        if number % 3 in remainders
+                    }
+                )
+
+
+class RecipeScoresTests(RecipesTestCase):
+    def setUp(self):
+        super().setUp()
+        call_command('update_recipe_scores', stdout=StringIO())
+        self.recipes = list(Recipe.objects.order_by('id'))
+
+    def url(self, recipe, action):
+        return f'{RECIPES_URL}{recipe.id}/{action}/'
+
+    def change_events(self):
+        recipes = self.recipes
+        self.client.force_authenticate(self.users[2])
+        self.client.post(
+            f'{RECIPES_URL}favorite/',
+            {'recipes': [recipes[0].id, recipes[2].id]}, format='json'
+        )
+        self.client.post(self.url(recipes[0], 'shopping_cart'))
+        self.client.post(self.url(recipes[4], 'favorite'))
+        self.client.delete(self.url(recipes[2], 'favorite'))
+        self.client.force_authenticate(self.users[0])
+        self.client.delete(self.url(recipes[1], 'favorite'))
+        self.client.delete(
+            f'{RECIPES_URL}shopping_cart/',
+            {'recipes': [recipes[1].id, recipes[2].id]}, format='json'
+        )
+
+    def test_stored_scores_match_recomputed(self):
+        self.change_events()
+        stored = {
+            recipe['id']: recipe
+            for recipe in Recipe.objects.values('id', *SCORE_HALF_LIVES)
+        }
+        for recipe_id, scores in compute_scores(list(stored)).items():
+            for field, score in scores.items():
+                with self.subTest(recipe_id=recipe_id, field=field):
+                    self.assertAlmostEqual(
+                        stored[recipe_id][field], score, places=6
+                    )
+
+        for ordering, (field, _) in RECIPE_ORDERINGS.items():
+            field = field.lstrip('-')
+            with self.subTest(ordering=ordering):
+                response = self.client.get(
+                    RECIPES_URL, {'ordering': ordering, 'limit': 15}
+                )
+                self.assertEqual(
+                    [recipe['id'] for recipe in response.json()['results']],
+                    sorted(
+                        stored,
+                        key=lambda pk: (-stored[pk][field], -pk)
+                    )
+                )
+
+
+class ShoppingCartTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='cook@example.com', username='cook', first_name='Имя',
+            last_name='Фамилия', password='Password-12345'
+        )
+        ingredients = {
+            unit: Ingredient.objects.create(
+                name='мука' if unit in ('кг', 'г') else 'молоко',
+                measurement_unit=unit
+            )
+            for unit in ('кг', 'г', 'л', 'мл')
+        }
+        cls.recipes = []
+        for number, lines in enumerate((
+            {'кг': 1, 'л': 1}, {'г': 200, 'мл': 300}, {'кг': 2},
+        )):
+            recipe = Recipe.objects.create(
+                author=cls.user, name=f'Рецепт {number}', text='Описание',
+                cooking_time=10, image='recipes/image.png'
+            )
+            IngredientQuantity.objects.bulk_create(
+                IngredientQuantity(
+                    recipe=recipe, ingredient=ingredients[unit],
+                    amount=amount
+                )
+                for unit, amount in lines.items()
+            )
+            cls.recipes.append(recipe)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def get_shopping_cart(self):
+        response = self.client.get(f'{RECIPES_URL}shopping_cart/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_batch_add_then_single_remove(self):
+        self.assertEqual(self.get_shopping_cart(), [])
+        self.client.post(
+            f'{RECIPES_URL}shopping_cart/',
+            {'recipes': [recipe.id for recipe in self.recipes]},
+            format='json'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(
+                f'{RECIPES_URL}{self.recipes[1].id}/shopping_cart/'
+            )
+        self.assertEqual(response.status_code, 204)
+
+        state = cache.get(shopping_cart_key(self.user.id))
+        kept = [self.recipes[0].id, self.recipes[2].id]
+        self.assertEqual(list(state['recipes']), kept)
+        self.assertEqual(state['totals'], load_totals(kept))
+        self.assertEqual(get_shopping_cart_state(self.user), state)
+        self.assertEqual(self.get_shopping_cart(), [
+            {'name': 'молоко', 'measurement_unit': 'мл', 'amount': 1000},
+            {'name': 'мука', 'measurement_unit': 'г', 'amount': 3000},
+        ])
+
+    def test_merge_units(self):
+        self.assertEqual(merge_units([
+            ['мука', 'кг', 2], ['мука', 'г', 200], ['молоко', 'л', 1],
+            ['молоко', 'мл', 300], ['яйца', 'шт', 2], ['яйца', 'шт.', 1],
+            ['соль', 'по вкусу', 1],
+        ]), [
+            ('молоко', 'мл', 1300), ('мука', 'г', 2200),
+            ('соль', 'по вкусу', 1), ('яйца', 'шт.', 3),
+        ])
+
+    def test_json_shopping_cart(self):
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=self.user, recipe=recipe)
+            for recipe in self.recipes
+        )
+        self.assertEqual(self.get_shopping_cart(), [
+            {'name': 'молоко', 'measurement_unit': 'мл', 'amount': 1300},
+            {'name': 'мука', 'measurement_unit': 'г', 'amount': 3200},
+        ])
+
+
+class IngredientAutocompleteTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'мука {number:02}', measurement_unit='г')
+            for number in range(30)
+        )
+
+    def test_limit_is_clamped(self):
+        for limit, expected in (('0', 1), ('5', 5), ('1000', 20), ('', 20)):
+            with self.subTest(limit=limit):
+                response = self.client.get(
+                    '/api/ingredients/', {'name': 'мук', 'limit': limit}
+                )
+                self.assertEqual(len(response.json()), expected)
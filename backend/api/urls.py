@@ -1,6 +1,9 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from api.views.profiling import ProfilingStatsView
+from api.views.reads import (async_read, ingredients_list, recipe_detail,
+                             recipes_list, subscriptions, tags_list)
 from api.views.recipes import IngredientsViewSet, RecipesViewSet, TagsViewSet
 from api.views.users import UsersViewSet
 
@@ -12,7 +15,32 @@ router.register('tags', TagsViewSet)
 router.register('recipes', RecipesViewSet)
 router.register('users', UsersViewSet)
 
+LIST_ACTIONS = {'get': 'list', 'post': 'create'}
+DETAIL_ACTIONS = {
+    'get': 'retrieve',
+    'put': 'update',
+    'patch': 'partial_update',
+    'delete': 'destroy',
+}
+
 urlpatterns = [
+    path('recipes/', async_read(
+        RecipesViewSet.as_view(LIST_ACTIONS), recipes_list
+    )),
+    path('recipes/<int:pk>/', async_read(
+        RecipesViewSet.as_view(DETAIL_ACTIONS), recipe_detail
+    )),
+    path('tags/', async_read(TagsViewSet.as_view(LIST_ACTIONS), tags_list)),
+    path('ingredients/', async_read(
+        IngredientsViewSet.as_view(LIST_ACTIONS), ingredients_list
+    )),
+    path('users/subscriptions/', async_read(
+        UsersViewSet.as_view(
+            {'get': 'subscriptions'}, **UsersViewSet.subscriptions.kwargs
+        ),
+        subscriptions
+    )),
     path('', include(router.urls)),
     path('auth/', include('djoser.urls.authtoken')),
+    path('profiling/', ProfilingStatsView.as_view(), name='profiling'),
 ]
@@ -1,27 +1,116 @@
+import csv
+
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.response import Response
 
 from api.serializers.recipes import RecipeRepresentationSerializer
-from recipes.models import Recipe
+from recipes.counters import update_recipe_counter
+from recipes.models import Recipe, ShoppingCart
+from recipes.personalization import invalidate_recipe_ids
+from recipes.shopping_cart import update_shopping_cart
 
 
 def add_object_model(model, user, pk):
-    if model.objects.filter(user=user, recipe__id=pk).exists():
+    recipe = get_object_or_404(Recipe, id=pk)
+    try:
+        with transaction.atomic():
+            model.objects.create(user=user, recipe=recipe)
+    except IntegrityError:
         return Response({
             'errors': 'Рецепт уже добавлен в список'
         }, status=status.HTTP_400_BAD_REQUEST)
-    recipe = get_object_or_404(Recipe, id=pk)
-    model.objects.create(user=user, recipe=recipe)
     serializer = RecipeRepresentationSerializer(recipe)
     return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
 def delete_object_model(model, user, pk):
-    obj = model.objects.filter(user=user, recipe__id=pk)
-    if obj.exists():
-        obj.delete()
+    with transaction.atomic():
+        queryset = model.objects.filter(user=user, recipe__id=pk)
+        deleted = list(queryset.select_for_update().values_list('id'))
+        queryset.delete()
+    if deleted:
         return Response(status=status.HTTP_204_NO_CONTENT)
     return Response({
         'errors': 'Рецепт уже удален'
     }, status=status.HTTP_400_BAD_REQUEST)
+
+
+def batch_results(ids, statuses, default):
+    return Response({
+        'results': [
+            {'id': pk, 'status': statuses.get(pk, default)} for pk in ids
+        ]
+    })
+
+
+def add_objects_model(model, user, ids):
+    ids = list(dict.fromkeys(ids))
+    found = set(
+        Recipe.objects.filter(id__in=ids).values_list('id', flat=True)
+    )
+    with transaction.atomic():
+        existing = set(
+            model.objects
+            .filter(user=user, recipe_id__in=found)
+            .values_list('recipe_id', flat=True)
+        )
+        missing = found - existing
+        added_at = timezone.now()
+        model.objects.bulk_create(
+            (
+                model(user=user, recipe_id=pk, added_at=added_at)
+                for pk in missing
+            ),
+            ignore_conflicts=True
+        )
+        added = set(
+            model.objects
+            .filter(user=user, recipe_id__in=missing, added_at=added_at)
+            .values_list('recipe_id', flat=True)
+        )
+        existing |= missing - added
+        update_recipe_counter(model, added, 1, added_at)
+    if added:
+        invalidate_recipe_ids(model, (user.id,))
+        if model is ShoppingCart:
+            update_shopping_cart(user.id, added, True)
+    statuses = dict.fromkeys(added, 'added')
+    statuses.update(dict.fromkeys(existing, 'exists'))
+    return batch_results(ids, statuses, 'not_found')
+
+
+def delete_objects_model(model, user, ids):
+    ids = list(dict.fromkeys(ids))
+    with transaction.atomic():
+        queryset = model.objects.filter(user=user, recipe_id__in=ids)
+        deleted = set(
+            queryset.select_for_update().values_list('recipe_id', flat=True)
+        )
+        queryset.delete()
+    return batch_results(ids, dict.fromkeys(deleted, 'deleted'), 'not_found')
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def shopping_cart_txt(ingredients):
+    for name, measurement_unit, amount in ingredients:
+        yield f'{name} - {amount} {measurement_unit}\n'
+
+
+def shopping_cart_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('Ингредиент', 'Количество', 'Единица измерения'))
+    for name, measurement_unit, amount in ingredients:
+        yield writer.writerow((name, amount, measurement_unit))
+
+
+SHOPPING_CART_FORMATS = {
+    'txt': (shopping_cart_txt, 'text/plain; charset=utf-8'),
+    'csv': (shopping_cart_csv, 'text/csv; charset=utf-8'),
+}
@@ -0,0 +1,17 @@
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from foodgram.profiling import profile_stats
+
+
+class ProfilingStatsView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(profile_stats.snapshot())
+
+    def delete(self, request):
+        profile_stats.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
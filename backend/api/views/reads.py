@@ -0,0 +1,240 @@
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.utils.translation import gettext as _
+from django_filters.utils import translate_validation
+from rest_framework.exceptions import (APIException, AuthenticationFailed,
+                                       NotAuthenticated, NotFound)
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from api.authentication import CachedTokenAuthentication
+from api.filters import IngredientsFilter, RecipesFilter, TagsFilter
+from api.mixins import (CATALOG_CACHE_TIMEOUT, catalog_cache_key,
+                        catalog_validators, conditional_response)
+from api.pagination import CustomPageNumberPagination, KeysetPagination
+from api.renderers import ORJSONRenderer
+from api.serializers.fragments import (fragments_etag, get_recipe_fragments,
+                                       image_rendition, page_etag,
+                                       prefetch_subscriptions, render_recipe)
+from api.serializers.recipes import (IngredientsSerializer, RecipesSerializer,
+                                     TagsSerializer)
+from api.serializers.users import FollowsSerializer
+from api.views.users import prefetch_limited_recipes
+from recipes.autocomplete import autocomplete_limit, ingredient_index
+from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.personalization import get_recipe_ids
+from users.models import Follow
+
+PERSONAL_MODELS = (Favorite, ShoppingCart)
+
+
+def json_response(data, status=200):
+    return HttpResponse(
+        ORJSONRenderer().render(data),
+        status=status,
+        content_type='application/json'
+    )
+
+
+def use_sync_view(request):
+    page = request.GET.get('page', '1')
+    return (
+        request.method != 'GET'
+        or KeysetPagination.cursor_query_param in request.GET
+        or not page.isdigit()
+    )
+
+
+def async_read(sync_view, read_view):
+    sync_handler = sync_to_async(sync_view)
+
+    @wraps(sync_view)
+    async def view(request, *args, **kwargs):
+        if use_sync_view(request):
+            return await sync_handler(request, *args, **kwargs)
+        try:
+            return await read_view(request, *args, **kwargs)
+        except APIException as exc:
+            data = exc.detail
+            if not isinstance(data, (dict, list)):
+                data = {'detail': data}
+            response = json_response(data, exc.status_code)
+            if isinstance(exc, (AuthenticationFailed, NotAuthenticated)):
+                response['WWW-Authenticate'] = 'Token'
+            return response
+
+    return view
+
+
+async def get_user(request):
+    credentials = await sync_to_async(
+        CachedTokenAuthentication().authenticate
+    )(request)
+    if credentials is None:
+        return AnonymousUser()
+    return credentials[0]
+
+
+async def fetch(queryset):
+    return [obj async for obj in queryset]
+
+
+async def personal_context(user):
+    recipe_ids = await asyncio.gather(*(
+        sync_to_async(get_recipe_ids)(model, user)
+        for model in PERSONAL_MODELS
+    ))
+    return {
+        f'{model._meta.model_name}_ids': ids
+        for model, ids in zip(PERSONAL_MODELS, recipe_ids)
+    }
+
+
+def page_params(request):
+    pagination = CustomPageNumberPagination
+    number = int(request.GET.get('page', '1'))
+    size = request.GET.get(pagination.page_size_query_param, '')
+    size = int(size) if size.isdigit() and int(size) else (
+        pagination.page_size
+    )
+    if number < 1:
+        raise NotFound(_('Invalid page.'))
+    return number, size, (number - 1) * size
+
+
+def paginated(request, number, size, count, results):
+    if number > 1 and (number - 1) * size >= count:
+        raise NotFound(_('Invalid page.'))
+    url = request.build_absolute_uri()
+    next_link = previous_link = None
+    if number * size < count:
+        next_link = replace_query_param(url, 'page', number + 1)
+    if number == 2:
+        previous_link = remove_query_param(url, 'page')
+    elif number > 2:
+        previous_link = replace_query_param(url, 'page', number - 1)
+    return {
+        'count': count,
+        'next': next_link,
+        'previous': previous_link,
+        'results': results,
+    }
+
+
+def filter_recipes(request):
+    filterset = RecipesFilter(
+        request.GET,
+        queryset=Recipe.objects.only('id', 'pub_date'),
+        request=request
+    )
+    if not filterset.is_valid():
+        raise translate_validation(filterset.errors)
+    return filterset.qs
+
+
+def etag_response(request, data, etag):
+    return conditional_response(request, json_response(data), etag)
+
+
+async def recipes_list(request):
+    request.user = user = await get_user(request)
+    queryset = await sync_to_async(filter_recipes)(request)
+    number, size, offset = page_params(request)
+    count, ids, context = await asyncio.gather(
+        queryset.acount(),
+        fetch(queryset.values_list('id', flat=True)[offset:offset + size]),
+        personal_context(user)
+    )
+    fragments = await sync_to_async(get_recipe_fragments)(ids)
+    context['request'] = request
+    await sync_to_async(prefetch_subscriptions)(fragments, context)
+    rendition = image_rendition(RecipesSerializer, True)
+    data = paginated(request, number, size, count, [
+        render_recipe(fragment, context, rendition) for fragment in fragments
+    ])
+    return etag_response(
+        request, data, page_etag(fragments, context, request, data)
+    )
+
+
+async def recipe_detail(request, pk):
+    request.user = user = await get_user(request)
+    fragments, context = await asyncio.gather(
+        sync_to_async(get_recipe_fragments)([pk]), personal_context(user)
+    )
+    if not fragments:
+        raise NotFound()
+    context['request'] = request
+    await sync_to_async(prefetch_subscriptions)(fragments, context)
+    rendition = image_rendition(RecipesSerializer, False)
+    return etag_response(
+        request,
+        render_recipe(fragments[0], context, rendition),
+        fragments_etag(fragments, context, request.build_absolute_uri())
+    )
+
+
+async def subscriptions(request):
+    request.user = user = await get_user(request)
+    if user.is_anonymous:
+        raise NotAuthenticated()
+    queryset = Follow.objects.filter(user=user).select_related('following')
+    number, size, offset = page_params(request)
+    count, follows = await asyncio.gather(
+        queryset.acount(), fetch(queryset[offset:offset + size])
+    )
+    await sync_to_async(prefetch_limited_recipes)(
+        follows, request.GET.get('recipes_limit', '')
+    )
+    serializer = FollowsSerializer(
+        follows, many=True, context={'request': request}
+    )
+    return json_response(
+        paginated(request, number, size, count, serializer.data)
+    )
+
+
+async def catalog_list(request, filterset_class, serializer_class):
+    model = serializer_class.Meta.model
+    version, etag, last_modified = await sync_to_async(catalog_validators)(
+        model
+    )
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if not_modified is not None:
+        return not_modified
+    key = catalog_cache_key(model, version, request)
+    data = await cache.aget(key)
+    if data is None:
+        queryset = filterset_class(
+            request.GET, queryset=model.objects.all()
+        ).qs
+        data = serializer_class(await fetch(queryset), many=True).data
+        await cache.aset(key, data, CATALOG_CACHE_TIMEOUT)
+    response = json_response(data)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+async def tags_list(request):
+    return await catalog_list(request, TagsFilter, TagsSerializer)
+
+
+async def ingredients_list(request):
+    name = request.GET.get('name')
+    if not name:
+        return await catalog_list(
+            request, IngredientsFilter, IngredientsSerializer
+        )
+    limit = autocomplete_limit(request.GET.get('limit', ''))
+    return json_response(
+        await sync_to_async(ingredient_index.search)(name, limit)
+    )
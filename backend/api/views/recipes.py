@@ -1,22 +1,32 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets
+from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+from rest_framework.response import Response
 
 from api.filters import IngredientsFilter, RecipesFilter, TagsFilter
-from api.pagination import CustomPageNumberPagination
+from api.mixins import CatalogCacheMixin, RecipeFragmentsMixin
+from api.pagination import CustomPageNumberPagination, RecipesPagination
 from api.permissions import IsAdminOrReadOnly, IsAuthorOrReadOnly
+from api.serializers.fragments import (get_recipe_fragments,
+                                       image_rendition,
+                                       prefetch_subscriptions, render_recipe)
 from api.serializers.recipes import (IngredientsSerializer,
+                                     RecipeIdsSerializer,
+                                     RecipeMatchSerializer,
                                      RecipesCreateSerializer,
                                      RecipesSerializer, TagsSerializer)
-from api.utils import add_object_model, delete_object_model
-from recipes.models import (Favorite, Ingredient, IngredientQuantity, Recipe,
-                            ShoppingCart, Tag)
+from api.utils import (SHOPPING_CART_FORMATS, add_object_model,
+                       add_objects_model, delete_object_model,
+                       delete_objects_model)
+from recipes.autocomplete import autocomplete_limit, ingredient_index
+from recipes.matching import recipe_match_index
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from recipes.shopping_cart import get_shopping_cart
 
 
-class TagsViewSet(viewsets.ModelViewSet):
+class TagsViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagsSerializer
     pagination_class = None
@@ -25,7 +35,7 @@ class TagsViewSet(viewsets.ModelViewSet):
     filter_backends = (DjangoFilterBackend,)
 
 
-class IngredientsViewSet(viewsets.ModelViewSet):
+class IngredientsViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientsSerializer
     pagination_class = None
@@ -33,14 +43,24 @@ class IngredientsViewSet(viewsets.ModelViewSet):
     filterset_class = IngredientsFilter
     filter_backends = (DjangoFilterBackend,)
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if not name:
+            return super().list(request, *args, **kwargs)
+        limit = autocomplete_limit(request.query_params.get('limit', ''))
+        return Response(ingredient_index.search(name, limit))
 
-class RecipesViewSet(viewsets.ModelViewSet):
+
+class RecipesViewSet(RecipeFragmentsMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
-    pagination_class = CustomPageNumberPagination
+    pagination_class = RecipesPagination
     permission_classes = (IsAuthorOrReadOnly,)
     filterset_class = RecipesFilter
     filter_backends = (DjangoFilterBackend,)
 
+    def get_queryset(self):
+        return Recipe.objects.with_related()
+
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
             return RecipesSerializer
@@ -64,25 +84,72 @@ class RecipesViewSet(viewsets.ModelViewSet):
             return delete_object_model(ShoppingCart, request.user, pk)
         return None
 
+    def batch(self, model, request):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['recipes']
+        if request.method == 'POST':
+            return add_objects_model(model, request.user, ids)
+        return delete_objects_model(model, request.user, ids)
+
+    @action(detail=False, methods=['post', 'delete'],
+            url_path='favorite', url_name='favorite-batch',
+            permission_classes=[IsAuthenticated])
+    def favorite_batch(self, request):
+        return self.batch(Favorite, request)
+
+    @action(detail=False, methods=['get', 'post', 'delete'],
+            url_path='shopping_cart', url_name='shopping-cart-batch',
+            permission_classes=[IsAuthenticated])
+    def shopping_cart_batch(self, request):
+        if request.method == 'GET':
+            return Response([
+                {'name': name, 'measurement_unit': unit, 'amount': amount}
+                for name, unit, amount in get_shopping_cart(request.user)
+            ])
+        return self.batch(ShoppingCart, request)
+
+    @action(
+        detail=False, url_path='can_cook', url_name='can-cook',
+        pagination_class=CustomPageNumberPagination
+    )
+    def can_cook(self, request):
+        serializer = RecipeMatchSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        matches = recipe_match_index.match(
+            serializer.validated_data['ingredients'],
+            serializer.validated_data['min_coverage']
+        )
+        page = self.paginate_queryset(matches)
+        coverage = {recipe_id: value for value, recipe_id in page}
+        fragments = get_recipe_fragments(list(coverage))
+        context = self.get_serializer_context()
+        prefetch_subscriptions(fragments, context)
+        rendition = image_rendition(RecipesSerializer, True)
+        return self.get_paginated_response([
+            dict(
+                render_recipe(fragment, context, rendition),
+                coverage=round(coverage[fragment['id']], 4)
+            )
+            for fragment in fragments
+        ])
+
     @action(
         detail=False,
         methods=('get', ),
         permission_classes=(IsAuthenticated, )
     )
     def download_shopping_cart(self, request):
-        ingredients = (
-            IngredientQuantity.objects
-            .filter(recipe__shopping_carts__user=request.user)
-            .values('ingredient__name', 'ingredient__measurement_unit')
-            .annotate(amount_sum=Sum('amount'))
-            .order_by()
+        file_format = request.query_params.get('type', 'txt')
+        if file_format not in SHOPPING_CART_FORMATS:
+            return Response({
+                'errors': 'Неподдерживаемый формат файла'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        renderer, content_type = SHOPPING_CART_FORMATS[file_format]
+        response = StreamingHttpResponse(
+            renderer(get_shopping_cart(request.user)),
+            content_type=content_type
         )
-        shopping_cart = '\n'.join([
-            f'{ingredient["ingredient__name"]} - {ingredient["amount_sum"]} '
-            f'{ingredient["ingredient__measurement_unit"]}'
-            for ingredient in ingredients
-        ])
-        filename = 'shopping_cart.txt'
-        response = HttpResponse(shopping_cart, content_type='text/plain')
+        filename = f'shopping_cart.{file_format}'
         response['Content-Disposition'] = f'attachment; filename={filename}'
         return response
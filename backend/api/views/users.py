@@ -1,16 +1,29 @@
-from django.db import IntegrityError
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.views import UserViewSet
 from rest_framework import status
 from rest_framework.decorators import action
-from rest_framework.generics import get_object_or_404
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from api.pagination import CustomPageNumberPagination
+from api.pagination import CustomPageNumberPagination, FollowsPagination
 from api.serializers.users import FollowsSerializer, UserSerializer
+from recipes.models import Recipe
+from users.follow_graph import follow, unfollow
 from users.models import Follow, User
 
 
+def prefetch_limited_recipes(follows, limit):
+    recipes = Recipe.objects.filter(
+        author__in=[subscription.following_id for subscription in follows]
+    )
+    if limit.isdigit():
+        recipes = recipes.latest_by_author(int(limit))
+    prefetch_related_objects(follows, Prefetch(
+        'following__recipes', queryset=recipes, to_attr='limited_recipes'
+    ))
+
+
 class UsersViewSet(UserViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -32,12 +45,8 @@ class UsersViewSet(UserViewSet):
             )
 
         if request.method == 'POST':
-            try:
-                subscribtion = Follow.objects.create(
-                    user=user,
-                    following=following
-                )
-            except IntegrityError:
+            subscribtion = follow(user, following)
+            if subscribtion is None:
                 return Response(
                     {'message': 'Вы уже подписаны на этого автора'},
                     status=status.HTTP_400_BAD_REQUEST
@@ -50,18 +59,26 @@ class UsersViewSet(UserViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         if request.method == 'DELETE':
-            get_object_or_404(Follow, user=user, following=following).delete()
+            if not unfollow(user, following):
+                raise NotFound()
             return Response(status=status.HTTP_204_NO_CONTENT)
 
         return Response(
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    @action(detail=False, permission_classes=(IsAuthenticated, ))
+    @action(
+        detail=False,
+        permission_classes=(IsAuthenticated, ),
+        pagination_class=FollowsPagination,
+    )
     def subscriptions(self, request):
         user = request.user
-        queryset = Follow.objects.filter(user=user)
+        queryset = Follow.objects.filter(user=user).select_related('following')
         pages = self.paginate_queryset(queryset)
+        prefetch_limited_recipes(
+            pages, request.query_params.get('recipes_limit', '')
+        )
         serializer = FollowsSerializer(
             pages, many=True, context={'request': request}
         )
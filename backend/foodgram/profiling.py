@@ -0,0 +1,170 @@
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceededError(Exception):
+    pass
+
+
+def view_tag(view_func, method):
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return view_func.__name__
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(method.lower())
+    if action is None:
+        return view_class.__name__
+    return f'{view_class.__name__}.{action}'
+
+
+class RequestProfile:
+    def __init__(self):
+        self.tag = None
+        self.queries = Counter()
+        self.sql_time = 0
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.view_finished = None
+        self.finished = None
+        self.size = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.queries[(sql, repr(params))] += 1
+
+    @property
+    def query_count(self):
+        return sum(self.queries.values())
+
+    @property
+    def duplicates(self):
+        return self.query_count - len(self.queries)
+
+    @property
+    def total_time(self):
+        return self.finished - self.started
+
+    @property
+    def view_time(self):
+        if self.view_started is None:
+            return 0
+        finished = self.view_finished or self.finished
+        return finished - self.view_started - self.sql_time
+
+    @property
+    def render_time(self):
+        if self.view_finished is None:
+            return 0
+        return self.finished - self.view_finished
+
+    def server_timing(self):
+        return ', '.join((
+            f'db;dur={self.sql_time * 1000:.1f};'
+            f'desc="{self.query_count} queries, '
+            f'{self.duplicates} duplicates"',
+            f'view;dur={self.view_time * 1000:.1f}',
+            f'render;dur={self.render_time * 1000:.1f}',
+            f'total;dur={self.total_time * 1000:.1f}',
+        ))
+
+
+class ProfileStats:
+    FIELDS = (
+        'requests', 'queries', 'max_queries', 'duplicates',
+        'sql_time', 'view_time', 'render_time', 'total_time', 'size'
+    )
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.stats = defaultdict(dict.fromkeys(self.FIELDS, 0).copy)
+
+    def add(self, profile):
+        with self.lock:
+            stats = self.stats[profile.tag]
+            stats['requests'] += 1
+            stats['queries'] += profile.query_count
+            stats['max_queries'] = max(
+                stats['max_queries'], profile.query_count
+            )
+            stats['duplicates'] += profile.duplicates
+            stats['sql_time'] += profile.sql_time
+            stats['view_time'] += profile.view_time
+            stats['render_time'] += profile.render_time
+            stats['total_time'] += profile.total_time
+            stats['size'] += profile.size or 0
+
+    def snapshot(self):
+        with self.lock:
+            stats = {tag: dict(values) for tag, values in self.stats.items()}
+        for values in stats.values():
+            requests = values['requests']
+            for field in self.FIELDS[1:]:
+                if field != 'max_queries':
+                    values[field] = round(values[field] / requests, 4)
+        return stats
+
+
+profile_stats = ProfileStats()
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        request.profile = profile
+        with connection.execute_wrapper(profile):
+            response = self.get_response(request)
+        profile.finished = time.perf_counter()
+        if profile.tag is None:
+            return response
+        if not response.streaming:
+            profile.size = len(response.content)
+        response['Server-Timing'] = profile.server_timing()
+        profile_stats.add(profile)
+        logger.debug(
+            '%s: %s queries (%s duplicates), %.1f ms',
+            profile.tag, profile.query_count, profile.duplicates,
+            profile.total_time * 1000
+        )
+        self.check_budget(profile)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.profile.tag = view_tag(view_func, request.method)
+        request.profile.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        request.profile.view_finished = time.perf_counter()
+        return response
+
+    def check_budget(self, profile):
+        budget = settings.QUERY_BUDGETS.get(profile.tag)
+        if budget is None or profile.query_count <= budget:
+            return
+        message = (
+            f'{profile.tag}: {profile.query_count} запросов к базе '
+            f'при бюджете {budget}'
+        )
+        if settings.QUERY_BUDGET_RAISE:
+            raise QueryBudgetExceededError(message)
+        logger.warning(message)
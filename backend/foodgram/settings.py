@@ -32,6 +32,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -72,6 +73,16 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    }
+}
+
 AUTH_USER_MODEL = 'users.User'
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -94,7 +105,11 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
 }
 
@@ -127,4 +142,33 @@ STATIC_ROOT = BASE_DIR / 'static'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+IMAGE_PROCESSING_WORKERS = int(
+    os.getenv('IMAGE_PROCESSING_WORKERS', default=2)
+)
+IMAGE_UPLOAD_MAX_SIZE = int(
+    os.getenv('IMAGE_UPLOAD_MAX_SIZE', default=10 * 1024 * 1024)
+)
+
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', default=10000))
+TOKEN_CACHE_TIMEOUT = int(os.getenv('TOKEN_CACHE_TIMEOUT', default=60))
+TOKEN_CACHE_SHARED = os.getenv('TOKEN_CACHE_SHARED', default='') == 'True'
+
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', default='') == 'True'
+QUERY_BUDGET_RAISE = os.getenv('QUERY_BUDGET_RAISE', default='') == 'True'
+QUERY_BUDGETS = {
+    'RecipesViewSet.list': 9,
+    'RecipesViewSet.retrieve': 7,
+    'RecipesViewSet.create': 14,
+    'RecipesViewSet.partial_update': 20,
+    'RecipesViewSet.favorite': 5,
+    'RecipesViewSet.shopping_cart': 5,
+    'RecipesViewSet.favorite_batch': 7,
+    'RecipesViewSet.shopping_cart_batch': 7,
+    'RecipesViewSet.download_shopping_cart': 4,
+    'UsersViewSet.subscriptions': 5,
+    'UsersViewSet.subscribe': 5,
+    'IngredientsViewSet.list': 2,
+    'TagsViewSet.list': 2,
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -1,7 +1,12 @@
 from django.contrib import admin
+from django.db import transaction
 
+from .fragments import invalidate_recipe_fragments
+from .matching import record_recipe_changes
 from .models import (Favorite, Ingredient, IngredientQuantity, Recipe,
                      ShoppingCart, Tag)
+from .search import update_search_vectors
+from .shopping_cart import invalidate_recipe_shopping_carts
 
 
 @admin.register(Tag)
@@ -23,13 +28,37 @@ class RecipesAdmin(admin.ModelAdmin):
     search_fields = ('name',)
 
     def quantity_favorites(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
 
 
 @admin.register(IngredientQuantity)
 class IngredientQuantitysAdmin(admin.ModelAdmin):
     list_display = ('id', 'ingredient', 'recipe', 'amount')
 
+    def lines_changed(self, recipe_ids):
+        recipe_ids = list(recipe_ids)
+        transaction.on_commit(lambda: invalidate_recipe_fragments(recipe_ids))
+        transaction.on_commit(lambda: update_search_vectors(recipe_ids))
+        transaction.on_commit(lambda: record_recipe_changes(recipe_ids))
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        self.lines_changed(
+            {obj.recipe_id, form.initial.get('recipe', obj.recipe_id)}
+        )
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_recipe_shopping_carts(obj.recipe_id)
+        self.lines_changed((obj.recipe_id,))
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = set(queryset.values_list('recipe_id', flat=True))
+        super().delete_queryset(request, queryset)
+        for recipe_id in recipe_ids:
+            invalidate_recipe_shopping_carts(recipe_id)
+        self.lines_changed(recipe_ids)
+
 
 @admin.register(Favorite)
 class FavoritesAdmin(admin.ModelAdmin):
@@ -0,0 +1,72 @@
+import threading
+import time
+from bisect import bisect_left
+
+from recipes.models import Ingredient
+
+AUTOCOMPLETE_LIMIT = 20
+AUTOCOMPLETE_MAX_AGE = 5 * 60
+
+
+def autocomplete_limit(value):
+    if not value.isdigit():
+        return AUTOCOMPLETE_LIMIT
+    return min(max(int(value), 1), AUTOCOMPLETE_LIMIT)
+
+
+class IngredientIndex:
+    """Отсортированный в памяти список ингредиентов для автодополнения.
+
+    Совпадения по началу названия ищутся бинарным поиском и выдаются
+    первыми, затем добавляются совпадения по подстроке.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built_at = None
+        self._keys = []
+        self._rows = []
+
+    def invalidate(self):
+        self._built_at = None
+
+    def _build(self):
+        rows = sorted(
+            Ingredient.objects.values('id', 'name', 'measurement_unit'),
+            key=lambda row: (row['name'].lower(), row['id'])
+        )
+        self._keys = [row['name'].lower() for row in rows]
+        self._rows = rows
+        self._built_at = time.monotonic()
+
+    def _ensure_built(self):
+        built_at = self._built_at
+        if built_at is None or (
+            time.monotonic() - built_at > AUTOCOMPLETE_MAX_AGE
+        ):
+            with self._lock:
+                if self._built_at is built_at:
+                    self._build()
+
+    def search(self, query, limit=AUTOCOMPLETE_LIMIT):
+        self._ensure_built()
+        keys, rows = self._keys, self._rows
+        query = query.lower()
+        found = []
+        index = bisect_left(keys, query)
+        while (
+            index < len(keys) and len(found) < limit
+            and keys[index].startswith(query)
+        ):
+            found.append(rows[index])
+            index += 1
+        if len(found) < limit:
+            for key, row in zip(keys, rows):
+                if query in key[1:] and not key.startswith(query):
+                    found.append(row)
+                    if len(found) == limit:
+                        break
+        return found
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,35 @@
+import time
+
+from django.core.cache import cache
+
+from recipes.models import Tag
+
+VERSION_CACHE_KEY = 'version:{}'
+TAG_MAP_CACHE_KEY = 'tag_map:{}'
+TAG_MAP_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def get_version(model):
+    key = VERSION_CACHE_KEY.format(model._meta.label_lower)
+    version = cache.get(key)
+    if version is not None:
+        return version
+    cache.add(key, time.time_ns() // 1000, None)
+    return cache.get(key)
+
+
+def bump_version(model):
+    cache.set(
+        VERSION_CACHE_KEY.format(model._meta.label_lower),
+        time.time_ns() // 1000,
+        None
+    )
+
+
+def get_tag_map():
+    key = TAG_MAP_CACHE_KEY.format(get_version(Tag))
+    tag_map = cache.get(key)
+    if tag_map is None:
+        tag_map = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(key, tag_map, TAG_MAP_CACHE_TIMEOUT)
+    return tag_map
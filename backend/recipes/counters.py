@@ -0,0 +1,26 @@
+from django.db.models import F
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.ranking import score_updates
+from users.models import User
+
+COUNTER_FIELDS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'shopping_cart_count',
+}
+
+
+def update_recipe_counter(model, pks, delta, added_at):
+    field = COUNTER_FIELDS[model]
+    Recipe.objects.filter(id__in=pks).update(
+        **{field: F(field) + delta},
+        **score_updates(model, added_at, delta > 0)
+    )
+
+
+def update_user_counter(field, pk, delta):
+    User.objects.filter(pk=pk).update(**{field: F(field) + delta})
+
+
+def deleting(origin, model):
+    return isinstance(origin, model) or getattr(origin, 'model', None) is model
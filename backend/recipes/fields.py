@@ -0,0 +1,23 @@
+from django.db import models
+
+SEARCH_CONFIG = 'russian'
+
+
+class SearchVectorField(models.Field):
+    def db_type(self, connection):
+        if connection.vendor == 'postgresql':
+            return 'tsvector'
+        return 'text'
+
+
+@SearchVectorField.register_lookup
+class SearchMatch(models.Lookup):
+    lookup_name = 'matches'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return (
+            f"{lhs} @@ websearch_to_tsquery('{SEARCH_CONFIG}', {rhs})",
+            (*lhs_params, *rhs_params)
+        )
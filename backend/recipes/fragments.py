@@ -0,0 +1,60 @@
+import time
+
+from django.core.cache import cache
+
+from recipes.cache import get_version
+from recipes.models import Ingredient, Recipe, Tag
+
+RECIPE_FRAGMENT_CACHE_KEY = 'recipe_fragment:{}:{}:{}:{}'
+RECIPE_FRAGMENT_CACHE_TIMEOUT = 60 * 60
+RECIPE_VERSION_CACHE_KEY = 'recipe_version:{}'
+
+
+def get_recipe_versions(ids):
+    keys = {pk: RECIPE_VERSION_CACHE_KEY.format(pk) for pk in ids}
+    versions = cache.get_many(keys.values())
+    missing = [key for key in keys.values() if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, time.time_ns() // 1000, None)
+        versions.update(cache.get_many(missing))
+    return {pk: versions[key] for pk, key in keys.items()}
+
+
+def fragment_keys(ids):
+    tags_version = get_version(Tag)
+    ingredients_version = get_version(Ingredient)
+    return {
+        pk: RECIPE_FRAGMENT_CACHE_KEY.format(
+            pk, version, tags_version, ingredients_version
+        )
+        for pk, version in get_recipe_versions(ids).items()
+    }
+
+
+def get_fragments(ids, build):
+    keys = fragment_keys(ids)
+    cached = cache.get_many(keys.values())
+    fragments = {pk: cached[key] for pk, key in keys.items() if key in cached}
+    missing = [pk for pk in keys if pk not in fragments]
+    if missing:
+        built = {fragment['id']: fragment for fragment in build(missing)}
+        cache.set_many(
+            {keys[pk]: fragment for pk, fragment in built.items()},
+            RECIPE_FRAGMENT_CACHE_TIMEOUT
+        )
+        fragments.update(built)
+    return [fragments[pk] for pk in ids if pk in fragments]
+
+
+def invalidate_recipe_fragments(ids):
+    version = time.time_ns() // 1000
+    cache.set_many(
+        {RECIPE_VERSION_CACHE_KEY.format(pk): version for pk in ids}, None
+    )
+
+
+def invalidate_author_fragments(author_id):
+    invalidate_recipe_fragments(
+        Recipe.objects.filter(author_id=author_id).values_list('id', flat=True)
+    )
@@ -0,0 +1,76 @@
+import hashlib
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from PIL import Image, ImageOps, features
+
+from recipes.fragments import invalidate_recipe_fragments
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS = {
+    'thumbnail': (320, 320),
+    'medium': (800, 800),
+}
+RENDITION_FORMAT = 'WEBP' if features.check('webp') else 'JPEG'
+RENDITION_EXTENSION = 'webp' if RENDITION_FORMAT == 'WEBP' else 'jpg'
+RENDITION_QUALITY = 80
+
+rendition_executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_PROCESSING_WORKERS,
+    thread_name_prefix='renditions'
+)
+
+
+def content_name(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def save_rendition(image, stem, name, size):
+    path = f'recipes/{name}/{stem}.{RENDITION_EXTENSION}'
+    if default_storage.exists(path):
+        return path
+    rendition = image.copy()
+    rendition.thumbnail(size)
+    buffer = io.BytesIO()
+    rendition.save(buffer, RENDITION_FORMAT, quality=RENDITION_QUALITY)
+    saved = default_storage.save(path, ContentFile(buffer.getvalue()))
+    if saved != path:
+        default_storage.delete(saved)
+    return path
+
+
+def make_renditions(recipe_id):
+    recipe = Recipe.objects.filter(pk=recipe_id).only('image').first()
+    if recipe is None or not recipe.image:
+        return
+    with recipe.image.open('rb') as file:
+        image = ImageOps.exif_transpose(Image.open(file)).convert('RGB')
+    stem = PurePosixPath(recipe.image.name).stem
+    Recipe.objects.filter(pk=recipe_id, image=recipe.image.name).update(**{
+        f'image_{name}': save_rendition(image, stem, name, size)
+        for name, size in RENDITIONS.items()
+    })
+    invalidate_recipe_fragments((recipe_id,))
+
+
+def process_renditions(recipe_id):
+    try:
+        make_renditions(recipe_id)
+    except Exception:
+        logger.exception(
+            'Не удалось обработать картинку рецепта %s', recipe_id
+        )
+    finally:
+        connections.close_all()
+
+
+def schedule_renditions(recipe_id):
+    rendition_executor.submit(process_renditions, recipe_id)
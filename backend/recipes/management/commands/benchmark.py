@@ -0,0 +1,258 @@
+import base64
+import io
+import json
+import random
+import subprocess
+import time
+from datetime import datetime
+from itertools import combinations
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+LIST_FILTERS = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+AUTOCOMPLETE_PREFIXES = ('м', 'мо', 'мол', 'са', 'к', 'чес', 'сы', 'ябл')
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, round(q / 100 * (len(values) - 1)))]
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def sample_image():
+    buffer = io.BytesIO()
+    Image.new('RGB', (400, 300), (220, 120, 40)).save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержки, число SQL-запросов и пропускную способность '
+        'основных эндпоинтов API'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', help='Пользователь для запросов')
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--scenario', action='append', default=[],
+            help='Запускать только сценарии, содержащие подстроку'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--label', help='Метка запуска, по умолчанию текущий коммит'
+        )
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+        parser.add_argument(
+            '--compare', help='Файл с результатами прошлого запуска'
+        )
+
+    def get_user(self, email):
+        if email:
+            return User.objects.get(email=email)
+        user = (
+            User.objects
+            .filter(follower__isnull=False, shopping_carts__isnull=False)
+            .first()
+        )
+        if user is None:
+            raise CommandError(
+                'Нет данных для замеров: выполните команду seed_data'
+            )
+        return user
+
+    def sample_ids(self, model, total=1000):
+        bounds = model.objects.order_by('id').values_list('id', flat=True)
+        first, last = bounds.first(), bounds.last()
+        candidates = {self.random.randint(first, last) for _ in range(total)}
+        return list(
+            model.objects.filter(id__in=candidates)
+            .values_list('id', flat=True)
+        )
+
+    def list_url(self, params):
+        query = []
+        for name in params:
+            if name == 'tags':
+                query.extend(f'tags={slug}' for slug in self.tag_slugs[:2])
+            elif name == 'author':
+                query.append(f'author={self.random.choice(self.authors)}')
+            elif name == 'tags_match':
+                query.append('tags_match=all')
+            else:
+                query.append(f'{name}=1')
+        return '/api/recipes/?' + '&'.join(query)
+
+    def recipe_payload(self):
+        return {
+            'name': 'Рецепт для замеров',
+            'text': 'Описание',
+            'cooking_time': self.random.randint(5, 120),
+            'tags': self.tag_ids[:2],
+            'ingredients': [
+                {'id': ingredient_id, 'amount': self.random.randint(1, 500)}
+                for ingredient_id in self.random.sample(
+                    self.ingredient_ids, min(10, len(self.ingredient_ids))
+                )
+            ],
+        }
+
+    def create_recipe(self):
+        return 'post', '/api/recipes/', dict(
+            self.recipe_payload(), image=self.image
+        )
+
+    def update_recipe(self):
+        if not self.created:
+            self.request(*self.create_recipe())
+        recipe_id = self.random.choice(self.created)
+        return 'patch', f'/api/recipes/{recipe_id}/', self.recipe_payload()
+
+    def scenarios(self):
+        for size in range(len(LIST_FILTERS) + 1):
+            for params in combinations(LIST_FILTERS, size):
+                name = '+'.join(params) or 'all'
+                yield f'recipes.list[{name}]', (
+                    lambda params=params: ('get', self.list_url(params), None)
+                )
+        yield 'recipes.list[tags+tags_match=all]', lambda: (
+            'get', self.list_url(('tags', 'tags_match')), None
+        )
+        yield 'recipes.detail', lambda: (
+            'get', f'/api/recipes/{self.random.choice(self.recipes)}/', None
+        )
+        yield 'users.subscriptions', lambda: (
+            'get', '/api/users/subscriptions/?recipes_limit=3', None
+        )
+        yield 'ingredients.autocomplete', lambda: (
+            'get',
+            '/api/ingredients/?name='
+            + self.random.choice(AUTOCOMPLETE_PREFIXES),
+            None
+        )
+        yield 'recipes.download_shopping_cart', lambda: (
+            'get', '/api/recipes/download_shopping_cart/', None
+        )
+        yield 'recipes.shopping_cart', lambda: (
+            'get', '/api/recipes/shopping_cart/', None
+        )
+        yield 'recipes.create', self.create_recipe
+        yield 'recipes.update', self.update_recipe
+
+    def request(self, method, url, data):
+        queries = 0
+
+        def counter(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            response = getattr(self.client, method)(url, data, format='json')
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise CommandError(f'{method.upper()} {url}: {response.data}')
+        if method == 'post':
+            self.created.append(response.data['id'])
+        return elapsed, queries
+
+    def run_scenario(self, make_request):
+        for _ in range(self.warmup):
+            self.request(*make_request())
+        latencies, queries = [], []
+        for _ in range(self.requests):
+            elapsed, count = self.request(*make_request())
+            latencies.append(elapsed * 1000)
+            queries.append(count)
+        result = {
+            f'p{q}': round(percentile(latencies, q), 2) for q in PERCENTILES
+        }
+        result['mean'] = round(sum(latencies) / len(latencies), 2)
+        result['queries'] = round(sum(queries) / len(queries), 2)
+        result['rps'] = round(len(latencies) * 1000 / sum(latencies), 1)
+        return result
+
+    def compare(self, path, results):
+        with open(path, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)['scenarios']
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            before = baseline[name]
+            change = (result['p50'] - before['p50']) / before['p50'] * 100
+            self.stdout.write(
+                f'{name}: p50 {before["p50"]} -> {result["p50"]} мс '
+                f'({change:+.1f}%), запросов {before["queries"]} -> '
+                f'{result["queries"]}'
+            )
+
+    def setup(self, options):
+        self.random = random.Random(options['seed'])
+        self.requests = max(options['requests'], 1)
+        self.warmup = options['warmup']
+        user = self.get_user(options['email'])
+        token, _ = Token.objects.get_or_create(user=user)
+        self.client = APIClient(HTTP_HOST='127.0.0.1')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.tag_slugs = list(Tag.objects.values_list('slug', flat=True))
+        self.tag_ids = list(Tag.objects.values_list('id', flat=True))
+        self.ingredient_ids = self.sample_ids(Ingredient)
+        self.recipes = self.sample_ids(Recipe)
+        self.authors = list(
+            Recipe.objects.filter(id__in=self.recipes)
+            .values_list('author_id', flat=True).distinct()
+        )
+        self.image = sample_image()
+        self.created = []
+
+    def handle(self, *args, **options):
+        self.setup(options)
+        results = {}
+        try:
+            for name, make_request in self.scenarios():
+                if options['scenario'] and not any(
+                    part in name for part in options['scenario']
+                ):
+                    continue
+                results[name] = self.run_scenario(make_request)
+                self.stdout.write(f'{name}: {results[name]}')
+        finally:
+            for recipe_id in self.created:
+                self.client.delete(f'/api/recipes/{recipe_id}/')
+
+        report = {
+            'label': options['label'] or git_revision(),
+            'vendor': connection.vendor,
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'requests': self.requests,
+            'scenarios': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        if options['compare']:
+            self.compare(options['compare'], results)
+        self.stdout.write(self.style.SUCCESS('=== Замеры завершены ==='))
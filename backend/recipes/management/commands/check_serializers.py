@@ -0,0 +1,110 @@
+import time
+
+from django.core.management import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import ORJSONRenderer
+from api.serializers.recipes import RecipesSerializer
+from api.serializers.users import UserSerializer
+from recipes.models import Recipe
+from users.models import User
+
+
+class ReferenceUserSerializer(UserSerializer):
+    def to_representation(self, instance):
+        return serializers.ModelSerializer.to_representation(self, instance)
+
+
+class ReferenceRecipesSerializer(RecipesSerializer):
+    author = ReferenceUserSerializer(read_only=True)
+
+    def to_representation(self, instance):
+        return serializers.ModelSerializer.to_representation(self, instance)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает быстрые сериализаторы рецептов и пользователей со '
+        'стандартными DRF: проверяет совпадение ответов байт в байт и '
+        'замеряет время сериализации страницы'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', help='Пользователь для запросов')
+        parser.add_argument('--pages', type=int, default=20)
+        parser.add_argument('--page-size', type=int, default=6)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def render(self, serializer_class, renderer, objects, context):
+        return renderer.render(
+            serializer_class(objects, many=True, context=context).data
+        )
+
+    def measure(self, pages, *args):
+        started = time.perf_counter()
+        for _ in range(self.repeat):
+            for objects, context in pages:
+                self.render(*args, objects, context)
+        elapsed = time.perf_counter() - started
+        return elapsed * 1000 / (self.repeat * len(pages))
+
+    def compare(self, label, pages, reference, fast):
+        for objects, context in pages:
+            if self.render(*reference, objects, context) != self.render(
+                *fast, objects, context
+            ):
+                raise CommandError(
+                    f'{label}: ответы сериализаторов различаются'
+                )
+        reference_time = self.measure(pages, *reference)
+        fast_time = self.measure(pages, *fast)
+        self.stdout.write(
+            f'{label}: DRF {reference_time:.3f} мс/страница, '
+            f'быстрый {fast_time:.3f} мс/страница, '
+            f'ускорение {reference_time / fast_time:.1f}x'
+        )
+
+    def load_pages(self, queryset, context):
+        size = self.page_size
+        return [
+            (list(queryset[start:start + size]), context)
+            for start in range(0, self.pages * size, size)
+        ]
+
+    def handle(self, *args, **options):
+        self.repeat = max(options['repeat'], 1)
+        self.pages = max(options['pages'], 1)
+        self.page_size = max(options['page_size'], 1)
+        if options['email']:
+            user = User.objects.get(email=options['email'])
+        else:
+            user = User.objects.filter(favorites__isnull=False).first()
+        if user is None:
+            raise CommandError(
+                'Нет данных для проверки: выполните команду seed_data'
+            )
+        request = RequestFactory().get(
+            '/api/recipes/', HTTP_HOST='127.0.0.1'
+        )
+        request.user = user
+        context = {'request': request}
+        recipe_pages = self.load_pages(
+            Recipe.objects.with_related(), context
+        )
+        user_pages = self.load_pages(User.objects.order_by('id'), context)
+
+        self.compare(
+            'recipes', recipe_pages,
+            (ReferenceRecipesSerializer, JSONRenderer()),
+            (RecipesSerializer, ORJSONRenderer())
+        )
+        self.compare(
+            'users', user_pages,
+            (ReferenceUserSerializer, JSONRenderer()),
+            (UserSerializer, ORJSONRenderer())
+        )
+        self.stdout.write(self.style.SUCCESS(
+            '=== Ответы сериализаторов совпадают ==='
+        ))
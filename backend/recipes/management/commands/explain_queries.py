@@ -0,0 +1,94 @@
+import json
+import time
+
+from django.core.cache import cache
+from django.core.management import BaseCommand
+from django.db import connection
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, Tag
+from users.models import User
+
+ENDPOINTS = (
+    '/api/recipes/',
+    '/api/recipes/?page=50',
+    '/api/recipes/?tags={tag}',
+    '/api/recipes/?author={author}',
+    '/api/recipes/?is_favorited=1',
+    '/api/recipes/?is_in_shopping_cart=1',
+    '/api/recipes/?cursor=',
+    '/api/recipes/{recipe}/',
+    '/api/users/subscriptions/?recipes_limit=3',
+    '/api/ingredients/?name=мол',
+    '/api/tags/',
+    '/api/recipes/download_shopping_cart/',
+)
+
+
+class Command(BaseCommand):
+    help = 'Выполняет EXPLAIN для каждого SQL-запроса основных эндпоинтов API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', help='Пользователь для запросов')
+        parser.add_argument(
+            '--output', help='Файл для сохранения планов в формате JSON'
+        )
+
+    def explain(self, sql, params):
+        if connection.vendor == 'postgresql':
+            prefix = 'EXPLAIN (ANALYZE, BUFFERS) '
+        else:
+            prefix = 'EXPLAIN QUERY PLAN '
+        with connection.cursor() as cursor:
+            started = time.perf_counter()
+            cursor.execute(prefix + sql, params)
+            plan = '\n'.join(' '.join(map(str, row)) for row in cursor)
+        return plan, (time.perf_counter() - started) * 1000
+
+    def capture(self, client, url):
+        queries = []
+
+        def wrapper(execute, sql, params, many, context):
+            queries.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(wrapper):
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response.status_code, queries
+
+    def handle(self, *args, **options):
+        if options['email']:
+            user = User.objects.get(email=options['email'])
+        else:
+            user = User.objects.filter(favorites__isnull=False).first()
+        recipe = Recipe.objects.filter(author=user).first() or (
+            Recipe.objects.first()
+        )
+        tag = Tag.objects.first()
+        client = APIClient(HTTP_HOST='127.0.0.1')
+        client.force_authenticate(user)
+        results = {}
+        for endpoint in ENDPOINTS:
+            url = endpoint.format(
+                tag=tag.slug, author=recipe.author_id, recipe=recipe.id
+            )
+            cache.clear()
+            status_code, queries = self.capture(client, url)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{url} -> {status_code}, запросов: {len(queries)}'
+            ))
+            results[url] = []
+            for sql, params in queries:
+                if not sql.lstrip().upper().startswith('SELECT'):
+                    continue
+                plan, duration = self.explain(sql, params)
+                results[url].append(
+                    {'sql': sql, 'plan': plan, 'duration_ms': duration}
+                )
+                self.stdout.write(f'{sql}\n{plan}\n{duration:.2f} ms\n')
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
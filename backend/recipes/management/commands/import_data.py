@@ -1,25 +1,339 @@
 import csv
+import io
+import json
+import time
+from itertools import islice
+from pathlib import Path
 
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import connection, transaction
 
-from recipes.models import Ingredient, Tag
+from recipes.autocomplete import ingredient_index
+from recipes.cache import bump_version
+from recipes.fragments import invalidate_recipe_fragments
+from recipes.matching import record_recipe_changes
+from recipes.models import Ingredient, IngredientQuantity, Recipe, Tag
+from recipes.shopping_cart import invalidate_recipe_shopping_carts
+from users.models import User
 
-MODELS_FILES = {
-    Ingredient: 'ingredients.csv',
-    Tag: 'tags.csv',
+DATA_DIR = Path('static/data')
+
+MODELS = {
+    'ingredients': {
+        'model': Ingredient,
+        'fields': ('name', 'measurement_unit'),
+        'unique_fields': ('name', 'measurement_unit'),
+        'update_fields': (),
+        'default': DATA_DIR / 'ingredients.csv',
+    },
+    'tags': {
+        'model': Tag,
+        'fields': ('name', 'color', 'slug'),
+        'unique_fields': ('slug',),
+        'update_fields': ('name', 'color'),
+        'default': DATA_DIR / 'tags.csv',
+    },
 }
 
 
+def read_rows(path):
+    path = Path(path)
+    with open(path, 'r', encoding='utf-8') as file:
+        if path.suffix == '.csv':
+            yield from csv.DictReader(file)
+        elif path.suffix == '.jsonl':
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        elif path.suffix == '.json':
+            yield from json.load(file)
+        else:
+            raise CommandError(f'Неподдерживаемый формат файла: {path}')
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
 class Command(BaseCommand):
-    def handle(self, *args, **options):
-        for model, file in MODELS_FILES.items():
-            with open(
-                f'static/data/{file}',
-                'r', encoding='utf-8',
-            ) as table:
-                reader = csv.DictReader(table)
-                model.objects.bulk_create(model(**data) for data in reader)
+    help = (
+        'Загружает ингредиенты, теги и рецепты из файлов CSV, JSON '
+        'или JSON Lines. Повторный запуск не создает дубликатов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ingredients', help='Файл с ингредиентами')
+        parser.add_argument('--tags', help='Файл с тегами')
+        parser.add_argument(
+            '--recipes', help='Файл с рецептами (JSON или JSON Lines)'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--update', action='store_true',
+            help='Обновлять уже существующие записи'
+        )
+        parser.add_argument(
+            '--no-copy', action='store_true',
+            help='Не использовать COPY в PostgreSQL'
+        )
+
+    def report(self, label, total, started, final=False):
+        elapsed = time.perf_counter() - started
+        rate = total / elapsed if elapsed else total
+        message = f'{label}: {total} строк, {rate:.0f} строк/с'
+        self.stdout.write(
+            self.style.SUCCESS(f'=== {message} ===') if final else message
+        )
 
-        self.stdout.write(self.style.SUCCESS(
-            '=== Ингредиенты и теги успешно загружены ===')
+    def upsert(self, config, rows):
+        model = config['model']
+        objs = [
+            model(**{field: row[field] for field in config['fields']})
+            for row in rows
+        ]
+        if self.update and config['update_fields']:
+            model.objects.bulk_create(
+                objs,
+                update_conflicts=True,
+                unique_fields=config['unique_fields'],
+                update_fields=config['update_fields']
+            )
+        else:
+            model.objects.bulk_create(objs, ignore_conflicts=True)
+
+    def copy(self, config, rows):
+        table = config['model']._meta.db_table
+        columns = ', '.join(config['fields'])
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(row[field] for field in config['fields'])
+        buffer.seek(0)
+        if self.update and config['update_fields']:
+            conflict = 'ON CONFLICT ({}) DO UPDATE SET {}'.format(
+                ', '.join(config['unique_fields']),
+                ', '.join(
+                    f'{field} = EXCLUDED.{field}'
+                    for field in config['update_fields']
+                )
+            )
+        else:
+            conflict = 'ON CONFLICT DO NOTHING'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMP TABLE import_rows ON COMMIT DROP AS '
+                f'SELECT {columns} FROM {table} WITH NO DATA'
+            )
+            cursor.copy_expert(
+                f'COPY import_rows ({columns}) FROM STDIN WITH (FORMAT csv)',
+                buffer
+            )
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) '
+                f'SELECT {columns} FROM import_rows {conflict}'
+            )
+
+    def import_model(self, label, path):
+        config = MODELS[label]
+        use_copy = connection.vendor == 'postgresql' and not self.no_copy
+        total, started = 0, time.perf_counter()
+        for batch in batches(read_rows(path), self.batch_size):
+            with transaction.atomic():
+                if use_copy:
+                    self.copy(config, batch)
+                else:
+                    self.upsert(config, batch)
+            total += len(batch)
+            self.report(label, total, started)
+        bump_version(config['model'])
+        return total, started
+
+    def import_recipes_batch(self, rows):
+        authors = dict(
+            User.objects
+            .filter(email__in={row['author'] for row in rows})
+            .values_list('email', 'id')
+        )
+        rows = [row for row in rows if row['author'] in authors]
+        Ingredient.objects.bulk_create(
+            (
+                Ingredient(
+                    name=line['name'],
+                    measurement_unit=line['measurement_unit']
+                )
+                for row in rows for line in row['ingredients']
+                if (line['name'], line['measurement_unit'])
+                not in self.ingredients
+            ),
+            ignore_conflicts=True
         )
+        ingredients_added = any(
+            (line['name'], line['measurement_unit']) not in self.ingredients
+            for row in rows for line in row['ingredients']
+        )
+        if ingredients_added:
+            self.load_ingredients()
+
+        existing = {
+            (recipe.author_id, recipe.name): recipe
+            for recipe in Recipe.objects.filter(
+                author_id__in=authors.values(),
+                name__in={row['name'] for row in rows}
+            ).only('id', 'author_id', 'name', 'image')
+        }
+        recipes = []
+        for row in rows:
+            recipe = existing.get((authors[row['author']], row['name']))
+            recipes.append(Recipe(
+                id=recipe and recipe.id,
+                author_id=authors[row['author']],
+                name=row['name'],
+                text=row['text'],
+                cooking_time=row['cooking_time'],
+                image=row.get('image', recipe.image if recipe else '')
+            ))
+        imported = [
+            (recipe, row) for recipe, row in zip(recipes, rows)
+            if self.update or recipe.id is None
+        ]
+        if self.update:
+            self.update_recipes(recipes, existing)
+        Recipe.objects.bulk_create(
+            recipe for recipe in recipes if recipe.id is None
+        )
+
+        lines = [
+            IngredientQuantity(
+                recipe_id=recipe.id,
+                ingredient_id=self.ingredients[
+                    (line['name'], line['measurement_unit'])
+                ],
+                amount=line['amount']
+            )
+            for recipe, row in imported
+            for line in row['ingredients']
+        ]
+        if self.update:
+            self.delete_dropped_lines(lines, existing)
+            IngredientQuantity.objects.bulk_create(
+                lines,
+                update_conflicts=True,
+                unique_fields=('recipe', 'ingredient'),
+                update_fields=('amount',)
+            )
+        else:
+            IngredientQuantity.objects.bulk_create(lines)
+        tags_through = Recipe.tags.through
+        tags_through.objects.bulk_create(
+            (
+                tags_through(recipe_id=recipe.id, tag_id=self.tags[slug])
+                for recipe, row in imported
+                for slug in row.get('tags', ())
+                if slug in self.tags
+            ),
+            ignore_conflicts=True
+        )
+        updated_ids = (
+            [recipe.id for recipe in existing.values()] if self.update else []
+        )
+        transaction.on_commit(lambda: self.invalidate_caches(
+            [recipe.id for recipe, _ in imported], updated_ids,
+            ingredients_added
+        ))
+        return len(rows)
+
+    def update_recipes(self, recipes, existing):
+        """Обновляет найденные рецепты.
+
+        Картинка меняется, только если она указана в файле; вместе с ней
+        сбрасываются уменьшенные копии, чтобы не отдавать старые.
+        """
+        old_images = {
+            recipe.id: recipe.image.name for recipe in existing.values()
+        }
+        same_image, new_image = [], []
+        for recipe in recipes:
+            if recipe.id is None:
+                continue
+            if recipe.image.name == old_images[recipe.id]:
+                same_image.append(recipe)
+            else:
+                recipe.image_thumbnail = recipe.image_medium = ''
+                new_image.append(recipe)
+        Recipe.objects.bulk_update(same_image, ('text', 'cooking_time'))
+        Recipe.objects.bulk_update(new_image, (
+            'text', 'cooking_time', 'image', 'image_thumbnail', 'image_medium'
+        ))
+
+    def delete_dropped_lines(self, lines, existing):
+        kept = {(line.recipe_id, line.ingredient_id) for line in lines}
+        IngredientQuantity.objects.filter(id__in=[
+            line_id
+            for line_id, recipe_id, ingredient_id in (
+                IngredientQuantity.objects
+                .filter(recipe_id__in=[
+                    recipe.id for recipe in existing.values()
+                ])
+                .values_list('id', 'recipe_id', 'ingredient_id')
+            )
+            if (recipe_id, ingredient_id) not in kept
+        ]).delete()
+
+    def invalidate_caches(self, recipe_ids, updated_ids, ingredients_added):
+        if ingredients_added:
+            bump_version(Ingredient)
+        invalidate_recipe_fragments(recipe_ids)
+        record_recipe_changes(recipe_ids)
+        for recipe_id in updated_ids:
+            invalidate_recipe_shopping_carts(recipe_id)
+
+    def load_ingredients(self):
+        self.ingredients = {
+            (name, measurement_unit): ingredient_id
+            for ingredient_id, name, measurement_unit
+            in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            )
+        }
+
+    def import_recipes(self, path):
+        self.load_ingredients()
+        self.tags = dict(Tag.objects.values_list('slug', 'id'))
+        total, skipped, started = 0, 0, time.perf_counter()
+        for batch in batches(read_rows(path), self.batch_size):
+            with transaction.atomic():
+                imported = self.import_recipes_batch(batch)
+            total += imported
+            skipped += len(batch) - imported
+            self.report('recipes', total, started)
+        if skipped:
+            self.stdout.write(self.style.WARNING(
+                f'Пропущено рецептов с неизвестным автором: {skipped}'
+            ))
+        call_command('recount_counters', stdout=self.stdout)
+        call_command('update_search_vectors', stdout=self.stdout)
+        call_command('update_recipe_scores', stdout=self.stdout)
+        return total, started
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.update = options['update']
+        self.no_copy = options['no_copy']
+        sources = {
+            label: options[label]
+            for label in (*MODELS, 'recipes') if options[label]
+        }
+        if not sources:
+            sources = {
+                label: config['default'] for label, config in MODELS.items()
+            }
+
+        for label, path in sources.items():
+            if label == 'recipes':
+                total, started = self.import_recipes(path)
+            else:
+                total, started = self.import_model(label, path)
+            self.report(label, total, started, final=True)
+        ingredient_index.invalidate()
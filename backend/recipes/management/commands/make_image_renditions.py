@@ -0,0 +1,19 @@
+from django.core.management import BaseCommand
+
+from recipes.images import make_renditions
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создает уменьшенные копии картинок рецептов'
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.filter(image_thumbnail='').values_list(
+            'id', flat=True
+        )
+        for recipe_id in recipes.iterator():
+            make_renditions(recipe_id)
+
+        self.stdout.write(self.style.SUCCESS(
+            '=== Уменьшенные копии картинок созданы ===')
+        )
@@ -0,0 +1,42 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow, User
+
+
+def count_subquery(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects
+            .filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики избранного, корзин, рецептов и подписчиков'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            recipes = Recipe.objects.update(
+                favorites_count=count_subquery(Favorite, 'recipe'),
+                shopping_cart_count=count_subquery(ShoppingCart, 'recipe')
+            )
+            users = User.objects.update(
+                recipes_count=count_subquery(Recipe, 'author'),
+                followers_count=count_subquery(Follow, 'following')
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'=== Счетчики пересчитаны: рецептов {recipes}, '
+            f'пользователей {users} ===')
+        )
@@ -0,0 +1,192 @@
+import random
+import time
+from itertools import accumulate
+
+from django.core.management import BaseCommand, call_command
+from django.db import transaction
+
+from recipes.models import (Favorite, Ingredient, IngredientQuantity, Recipe,
+                            ShoppingCart, Tag)
+from users.models import Follow, User
+
+SEED_TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+)
+SEED_INGREDIENTS = (
+    'молоко', 'мука', 'сахар', 'соль', 'яйца', 'масло', 'рис', 'гречка',
+    'картофель', 'морковь', 'лук', 'чеснок', 'томат', 'огурец', 'курица',
+    'говядина', 'свинина', 'сыр', 'творог', 'сметана', 'перец', 'яблоко',
+)
+SEED_UNITS = ('г', 'кг', 'мл', 'л', 'шт', 'ст. л.', 'ч. л.', 'по вкусу')
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу синтетическими данными для нагрузочных проверок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--ingredients', type=int, default=2000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--favorites-per-user', type=int, default=20)
+        parser.add_argument('--carts-per-user', type=int, default=5)
+        parser.add_argument('--follows-per-user', type=int, default=10)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def chunks(self, items, size=None):
+        size = size or self.batch_size
+        for start in range(0, len(items), size):
+            yield items[start:start + size]
+
+    def report(self, label, total, started):
+        elapsed = time.perf_counter() - started
+        rate = total / elapsed if elapsed else total
+        self.stdout.write(f'{label}: {total} строк, {rate:.0f} строк/с')
+
+    def popularity(self, ids):
+        return list(accumulate(1 / rank for rank in range(1, len(ids) + 1)))
+
+    def create_catalog(self, total):
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create(
+                Tag(name=name, color=color, slug=slug)
+                for name, color, slug in SEED_TAGS
+            )
+        if not Ingredient.objects.exists():
+            Ingredient.objects.bulk_create(
+                (
+                    Ingredient(
+                        name=(
+                            f'{SEED_INGREDIENTS[i % len(SEED_INGREDIENTS)]} '
+                            f'{i // len(SEED_INGREDIENTS)}'
+                        ),
+                        measurement_unit=SEED_UNITS[i % len(SEED_UNITS)]
+                    )
+                    for i in range(total)
+                ),
+                batch_size=self.batch_size
+            )
+        return (
+            list(Tag.objects.values_list('id', flat=True)),
+            list(Ingredient.objects.values_list('id', flat=True)),
+        )
+
+    def create_users(self, total):
+        offset = User.objects.count()
+        started = time.perf_counter()
+        for chunk in self.chunks(range(offset, offset + total)):
+            User.objects.bulk_create(
+                User(
+                    email=f'seed{i}@foodgram.local',
+                    username=f'seed{i}',
+                    first_name='Пользователь',
+                    last_name=str(i),
+                    password='!'
+                )
+                for i in chunk
+            )
+        self.report('users', total, started)
+        return list(User.objects.values_list('id', flat=True))
+
+    def create_recipe_chunk(self, chunk, user_ids, tag_ids, ingredient_ids,
+                            per_recipe):
+        tags_through = Recipe.tags.through
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author_id=self.random.choice(user_ids),
+                name=f'Рецепт {i}',
+                text='Описание рецепта',
+                cooking_time=self.random.randint(5, 120),
+                image='recipes/seed.png'
+            )
+            for i in chunk
+        )
+        IngredientQuantity.objects.bulk_create(
+            (
+                IngredientQuantity(
+                    recipe_id=recipe.id,
+                    ingredient_id=ingredient_id,
+                    amount=self.random.randint(1, 500)
+                )
+                for recipe in recipes
+                for ingredient_id in self.random.sample(
+                    ingredient_ids, per_recipe
+                )
+            ),
+            batch_size=self.batch_size
+        )
+        tags_through.objects.bulk_create(
+            (
+                tags_through(recipe_id=recipe.id, tag_id=tag_id)
+                for recipe in recipes
+                for tag_id in self.random.sample(
+                    tag_ids, self.random.randint(1, len(tag_ids))
+                )
+            ),
+            batch_size=self.batch_size
+        )
+
+    def create_recipes(self, total, *args):
+        started = time.perf_counter()
+        for chunk in self.chunks(range(total)):
+            with transaction.atomic():
+                self.create_recipe_chunk(chunk, *args)
+            self.report('recipes', chunk[-1] + 1, started)
+
+    def create_links(self, model, field, user_ids, target_ids, per_user):
+        per_user = min(per_user, len(target_ids))
+        if not per_user:
+            return
+        cum_weights = self.popularity(target_ids)
+        started = time.perf_counter()
+        for chunk in self.chunks(user_ids, self.batch_size // per_user + 1):
+            model.objects.bulk_create(
+                (
+                    model(user_id=user_id, **{field: target_id})
+                    for user_id in chunk
+                    for target_id in set(self.random.choices(
+                        target_ids, cum_weights=cum_weights, k=per_user
+                    ))
+                    if field != 'following_id' or target_id != user_id
+                ),
+                ignore_conflicts=True
+            )
+        self.report(
+            model._meta.model_name, len(user_ids) * per_user, started
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        tag_ids, ingredient_ids = self.create_catalog(options['ingredients'])
+        user_ids = self.create_users(options['users'])
+        self.create_recipes(
+            options['recipes'], user_ids, tag_ids, ingredient_ids,
+            min(options['ingredients_per_recipe'], len(ingredient_ids))
+        )
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+        self.random.shuffle(recipe_ids)
+        self.create_links(
+            Favorite, 'recipe_id', user_ids, recipe_ids,
+            options['favorites_per_user']
+        )
+        self.create_links(
+            ShoppingCart, 'recipe_id', user_ids, recipe_ids,
+            options['carts_per_user']
+        )
+        followed_ids = list(user_ids)
+        self.random.shuffle(followed_ids)
+        self.create_links(
+            Follow, 'following_id', user_ids, followed_ids,
+            options['follows_per_user']
+        )
+        call_command('recount_counters', stdout=self.stdout)
+        call_command('update_search_vectors', stdout=self.stdout)
+        call_command('update_recipe_scores', stdout=self.stdout)
+
+        self.stdout.write(self.style.SUCCESS(
+            '=== Тестовые данные успешно созданы ===')
+        )
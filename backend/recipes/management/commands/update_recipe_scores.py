@@ -0,0 +1,51 @@
+import time
+
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from recipes.models import Recipe
+from recipes.ranking import SCORE_HALF_LIVES, compute_scores
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рейтинги популярности и трендов рецептов по '
+        'избранному и корзинам покупок пакетами'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        batch_size = max(options['batch_size'], 1)
+        started = time.perf_counter()
+        last_id, total = 0, 0
+        while True:
+            recipe_ids = list(
+                Recipe.objects
+                .filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not recipe_ids:
+                break
+            with transaction.atomic():
+                Recipe.objects.bulk_update(
+                    (
+                        Recipe(id=recipe_id, **scores)
+                        for recipe_id, scores in compute_scores(
+                            recipe_ids
+                        ).items()
+                    ),
+                    list(SCORE_HALF_LIVES),
+                    batch_size=1000
+                )
+            last_id = recipe_ids[-1]
+            total += len(recipe_ids)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'recipes: {total} строк, {total / elapsed:.0f} строк/с'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            '=== Рейтинги рецептов обновлены ==='
+        ))
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management import BaseCommand
+
+from recipes.models import Recipe
+from recipes.search import update_search_vectors, use_search_vector
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает поисковые векторы рецептов пакетами'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if not use_search_vector():
+            self.stdout.write(
+                'Поисковый вектор хранится только в PostgreSQL, на этой '
+                'базе используется индекс в памяти процесса'
+            )
+            return
+        batch_size = max(options['batch_size'], 1)
+        started = time.perf_counter()
+        last_id, total = 0, 0
+        while True:
+            recipe_ids = list(
+                Recipe.objects
+                .filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not recipe_ids:
+                break
+            update_search_vectors(recipe_ids)
+            last_id = recipe_ids[-1]
+            total += len(recipe_ids)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'recipes: {total} строк, {total / elapsed:.0f} строк/с'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            '=== Поисковые векторы обновлены ==='
+        ))
@@ -0,0 +1,145 @@
+import heapq
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from itertools import chain
+
+from django.core.cache import cache
+
+from recipes.models import IngredientQuantity
+
+MATCH_SEQUENCE_CACHE_KEY = 'recipe_match:sequence'
+MATCH_CHANGE_CACHE_KEY = 'recipe_match:change:{}'
+MATCH_CHANGE_CACHE_TIMEOUT = 60 * 60
+MATCH_MAX_CHANGES = 200
+MATCH_MAX_AGE = 60 * 60
+MATCH_LIMIT = 1000
+
+
+def current_sequence():
+    cache.add(MATCH_SEQUENCE_CACHE_KEY, 0, None)
+    return cache.get(MATCH_SEQUENCE_CACHE_KEY) or 0
+
+
+def record_recipe_changes(recipe_ids):
+    current_sequence()
+    sequence = cache.incr(MATCH_SEQUENCE_CACHE_KEY)
+    cache.set(
+        MATCH_CHANGE_CACHE_KEY.format(sequence), list(recipe_ids),
+        MATCH_CHANGE_CACHE_TIMEOUT
+    )
+
+
+class RecipeMatchIndex:
+    """Обратный индекс «ингредиент -> рецепты» для подбора рецептов.
+
+    Для каждого ингредиента хранится отсортированный массив id рецептов,
+    для каждого рецепта — число строк ингредиентов. Изменения рецептов
+    записываются в журнал в общем кэше, и каждый процесс применяет их
+    к своему индексу, не перестраивая его целиком.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sequence = None
+        self._built_at = None
+        self._postings = {}
+        self._line_counts = array('H')
+
+    def _set_line_count(self, recipe_id, count):
+        counts = self._line_counts
+        if recipe_id >= len(counts):
+            counts.extend(bytes(2 * (recipe_id + 1 - len(counts))))
+        counts[recipe_id] = count
+
+    def _build(self, sequence):
+        postings = defaultdict(list)
+        line_counts = Counter()
+        for recipe_id, ingredient_id in (
+            IngredientQuantity.objects
+            .order_by('recipe_id')
+            .values_list('recipe_id', 'ingredient_id')
+            .iterator(chunk_size=10000)
+        ):
+            postings[ingredient_id].append(recipe_id)
+            line_counts[recipe_id] += 1
+        self._postings = {
+            ingredient_id: array('I', recipe_ids)
+            for ingredient_id, recipe_ids in postings.items()
+        }
+        self._line_counts = array('H')
+        for recipe_id, count in line_counts.items():
+            self._set_line_count(recipe_id, count)
+        self._sequence = sequence
+        self._built_at = time.monotonic()
+
+    def _update(self, recipe_ids):
+        lines = defaultdict(list)
+        for recipe_id, ingredient_id in (
+            IngredientQuantity.objects
+            .filter(recipe_id__in=recipe_ids)
+            .values_list('recipe_id', 'ingredient_id')
+        ):
+            lines[recipe_id].append(ingredient_id)
+        for recipe_id in recipe_ids:
+            for posting in self._postings.values():
+                index = bisect_left(posting, recipe_id)
+                if index < len(posting) and posting[index] == recipe_id:
+                    del posting[index]
+            for ingredient_id in lines[recipe_id]:
+                insort(
+                    self._postings.setdefault(ingredient_id, array('I')),
+                    recipe_id
+                )
+            self._set_line_count(recipe_id, len(lines[recipe_id]))
+
+    def _changed_recipes(self, sequence):
+        keys = [
+            MATCH_CHANGE_CACHE_KEY.format(number)
+            for number in range(self._sequence + 1, sequence + 1)
+        ]
+        changes = cache.get_many(keys)
+        if len(changes) < len(keys):
+            return None
+        return set(chain.from_iterable(changes.values()))
+
+    def _ensure_current(self):
+        sequence = current_sequence()
+        with self._lock:
+            if self._sequence == sequence and (
+                time.monotonic() - self._built_at < MATCH_MAX_AGE
+            ):
+                return
+            recipe_ids = None
+            if self._sequence is not None and (
+                0 < sequence - self._sequence <= MATCH_MAX_CHANGES
+            ) and time.monotonic() - self._built_at < MATCH_MAX_AGE:
+                recipe_ids = self._changed_recipes(sequence)
+            if recipe_ids is None:
+                self._build(sequence)
+            else:
+                self._update(recipe_ids)
+                self._sequence = sequence
+
+    def match(self, ingredient_ids, min_coverage=0, limit=MATCH_LIMIT):
+        self._ensure_current()
+        with self._lock:
+            postings = [
+                self._postings[ingredient_id]
+                for ingredient_id in set(ingredient_ids)
+                if ingredient_id in self._postings
+            ]
+            hits = Counter(chain.from_iterable(postings))
+            line_counts = self._line_counts
+            scored = [
+                (count / line_counts[recipe_id], recipe_id)
+                for recipe_id, count in hits.items()
+            ]
+        if min_coverage > 0:
+            scored = [item for item in scored if item[0] >= min_coverage]
+        return heapq.nlargest(limit, scored)
+
+
+recipe_match_index = RecipeMatchIndex()
@@ -0,0 +1,60 @@
+# Generated by Django 4.1.5 on 2026-10-18 17:39
+
+from django.db import migrations, models
+from django.db.models.functions import Least
+
+MAX_AMOUNT = 32767
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientQuantity = apps.get_model('recipes', 'IngredientQuantity')
+    duplicates = (
+        Ingredient.objects
+        .values('name', 'measurement_unit')
+        .annotate(keep_id=models.Min('id'), total=models.Count('id'))
+        .filter(total__gt=1)
+    )
+    for duplicate in duplicates:
+        keep_id = duplicate.pop('keep_id')
+        duplicate.pop('total')
+        extra_ids = Ingredient.objects.filter(**duplicate).exclude(
+            id=keep_id
+        ).values_list('id', flat=True)
+        for extra_id in list(extra_ids):
+            overlapping = IngredientQuantity.objects.filter(
+                ingredient_id=extra_id,
+                recipe__in=IngredientQuantity.objects.filter(
+                    ingredient_id=keep_id
+                ).values('recipe')
+            )
+            for recipe_id, amount in overlapping.values_list(
+                'recipe_id', 'amount'
+            ):
+                IngredientQuantity.objects.filter(
+                    recipe_id=recipe_id, ingredient_id=keep_id
+                ).update(amount=Least(
+                    models.F('amount') + amount, MAX_AMOUNT
+                ))
+            overlapping.delete()
+            IngredientQuantity.objects.filter(ingredient_id=extra_id).update(
+                ingredient_id=keep_id
+            )
+            Ingredient.objects.filter(id=extra_id).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient_name_unit'),
+        ),
+    ]
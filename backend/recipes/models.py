@@ -1,6 +1,10 @@
 from django.core.validators import MinValueValidator, RegexValidator
 from django.db import models
+from django.db.models.expressions import RawSQL, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
 
+from recipes.fields import SearchVectorField
 from users.models import User
 
 
@@ -19,6 +23,12 @@ class Ingredient(models.Model):
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
         ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(
+                fields=('name', 'measurement_unit'),
+                name='unique_ingredient_name_unit'
+            )
+        ]
 
     def __str__(self):
         return f'{self.name}, {self.measurement_unit}'
@@ -55,6 +65,34 @@ class Tag(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    def latest_by_author(self, limit):
+        ranked = self.annotate(position=Window(
+            expression=RowNumber(),
+            partition_by=models.F('author_id'),
+            order_by=models.F('pub_date').desc()
+        )).values('pk', 'position')
+        sql, params = ranked.query.sql_with_params()
+        return self.filter(pk__in=RawSQL(
+            f'SELECT ranked.id FROM ({sql}) ranked '
+            'WHERE ranked.position <= %s',
+            (*params, limit)
+        ))
+
+    def with_related(self):
+        return self.select_related('author').defer(
+            'search_vector'
+        ).prefetch_related(
+            'tags',
+            models.Prefetch(
+                'recipe_ingredient',
+                queryset=IngredientQuantity.objects.select_related(
+                    'ingredient'
+                )
+            )
+        )
+
+
 class Recipe(models.Model):
     ingredients = models.ManyToManyField(
         Ingredient,
@@ -68,6 +106,20 @@ class Recipe(models.Model):
         upload_to='recipes/'
     )
 
+    image_thumbnail = models.ImageField(
+        verbose_name='Миниатюра',
+        upload_to='recipes/thumbnail/',
+        blank=True,
+        editable=False
+    )
+
+    image_medium = models.ImageField(
+        verbose_name='Картинка для списка',
+        upload_to='recipes/medium/',
+        blank=True,
+        editable=False
+    )
+
     name = models.CharField(
         max_length=200,
         verbose_name='Название'
@@ -98,13 +150,63 @@ class Recipe(models.Model):
 
     pub_date = models.DateTimeField(
         verbose_name='Дата публикации',
-        auto_now=True
+        auto_now_add=True
+    )
+
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0,
+        editable=False
+    )
+
+    shopping_cart_count = models.PositiveIntegerField(
+        verbose_name='В корзинах покупок',
+        default=0,
+        editable=False
+    )
+
+    popularity_score = models.FloatField(
+        verbose_name='Рейтинг популярности',
+        default=0,
+        editable=False
+    )
+
+    trending_score = models.FloatField(
+        verbose_name='Рейтинг трендов',
+        default=0,
+        editable=False
+    )
+
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор',
+        null=True,
+        editable=False
     )
 
+    objects = RecipeQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='recipe_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['-popularity_score', '-id'],
+                name='recipe_popularity_idx'
+            ),
+            models.Index(
+                fields=['-trending_score', '-id'],
+                name='recipe_trending_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name[:50]
@@ -162,6 +264,11 @@ class Favorite(models.Model):
         related_name='favorites'
     )
 
+    added_at = models.DateTimeField(
+        verbose_name='Дата добавления',
+        default=timezone.now
+    )
+
     class Meta:
         verbose_name = 'Избранное'
         verbose_name_plural = 'Избранное'
@@ -171,6 +278,12 @@ class Favorite(models.Model):
                 fields=['user', 'recipe'], name='unique_recipe_in_favorite'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe', 'user'],
+                name='favorite_recipe_user_idx'
+            ),
+        ]
 
 
 class ShoppingCart(models.Model):
@@ -187,6 +300,11 @@ class ShoppingCart(models.Model):
         related_name='shopping_carts'
     )
 
+    added_at = models.DateTimeField(
+        verbose_name='Дата добавления',
+        default=timezone.now
+    )
+
     class Meta:
         verbose_name = 'Корзина покупок'
         verbose_name_plural = 'Корзины покупок'
@@ -197,3 +315,9 @@ class ShoppingCart(models.Model):
                 name='unique_recipe_in_shopping_cart'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe', 'user'],
+                name='shopping_cart_recipe_user_idx'
+            ),
+        ]
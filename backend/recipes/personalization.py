@@ -0,0 +1,42 @@
+from array import array
+from bisect import bisect_left
+
+from django.core.cache import cache
+
+RECIPE_IDS_CACHE_KEY = 'recipe_ids:{}:{}'
+RECIPE_IDS_CACHE_TIMEOUT = 60 * 60
+
+
+class IdSet:
+    def __init__(self, ids):
+        self.ids = ids
+
+    def __contains__(self, pk):
+        index = bisect_left(self.ids, pk)
+        return index < len(self.ids) and self.ids[index] == pk
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def get_recipe_ids(model, user):
+    if user.is_anonymous:
+        return IdSet(array('I'))
+    key = RECIPE_IDS_CACHE_KEY.format(model._meta.model_name, user.id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = array('I', (
+            model.objects
+            .filter(user=user)
+            .order_by('recipe_id')
+            .values_list('recipe_id', flat=True)
+        ))
+        cache.set(key, ids, RECIPE_IDS_CACHE_TIMEOUT)
+    return IdSet(ids)
+
+
+def invalidate_recipe_ids(model, user_ids):
+    cache.delete_many([
+        RECIPE_IDS_CACHE_KEY.format(model._meta.model_name, user_id)
+        for user_id in user_ids
+    ])
@@ -0,0 +1,97 @@
+import math
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+
+from recipes.models import Favorite, ShoppingCart
+
+SCORE_EPOCH = datetime(2023, 1, 1, tzinfo=timezone.utc)
+SCORE_HALF_LIVES = {
+    'popularity_score': 30 * 24 * 60 * 60,
+    'trending_score': 3 * 24 * 60 * 60,
+}
+EVENT_WEIGHTS = {
+    Favorite: 2,
+    ShoppingCart: 1,
+}
+RECIPE_ORDERINGS = {
+    'popular': ('-popularity_score', '-id'),
+    'trending': ('-trending_score', '-id'),
+}
+MIN_EXPONENT = -700
+MIN_SCORE_DELTA = 1e-9
+
+
+def event_score(field, model, timestamp):
+    """Вклад события в рейтинг в логарифмической шкале.
+
+    Вместо того чтобы уменьшать накопленный рейтинг со временем, вес
+    каждого нового события растет как 2 ** (t / период полураспада).
+    Порядок рецептов при этом тот же, что у суммы затухающих весов, а
+    строки не нужно переписывать по мере старения событий.
+    """
+    age = (timestamp - SCORE_EPOCH).total_seconds()
+    return (
+        math.log(EVENT_WEIGHTS[model])
+        + age * math.log(2) / SCORE_HALF_LIVES[field]
+    )
+
+
+def add_score(field, value):
+    current, value = F(field), Value(value)
+    return Case(
+        When(**{field: 0}, then=value),
+        default=Greatest(current, value) + Ln(1 + Exp(Greatest(
+            -Abs(current - value), Value(MIN_EXPONENT)
+        ))),
+        output_field=FloatField()
+    )
+
+
+def remove_score(field, value):
+    current = F(field)
+    return Case(
+        When(**{f'{field}__lte': value + MIN_SCORE_DELTA}, then=Value(0.0)),
+        default=current + Ln(1 - Exp(Greatest(
+            Value(value) - current, Value(MIN_EXPONENT)
+        ))),
+        output_field=FloatField()
+    )
+
+
+def score_updates(model, timestamp, added):
+    update = add_score if added else remove_score
+    return {
+        field: update(field, event_score(field, model, timestamp))
+        for field in SCORE_HALF_LIVES
+    }
+
+
+def sum_scores(values):
+    if not values:
+        return 0.0
+    top = max(values)
+    return top + math.log(sum(math.exp(value - top) for value in values))
+
+
+def compute_scores(recipe_ids):
+    events = defaultdict(lambda: defaultdict(list))
+    for model in EVENT_WEIGHTS:
+        for recipe_id, added_at in (
+            model.objects
+            .filter(recipe_id__in=recipe_ids)
+            .values_list('recipe_id', 'added_at')
+        ):
+            for field in SCORE_HALF_LIVES:
+                events[recipe_id][field].append(
+                    event_score(field, model, added_at)
+                )
+    return {
+        recipe_id: {
+            field: sum_scores(events[recipe_id][field])
+            for field in SCORE_HALF_LIVES
+        }
+        for recipe_id in recipe_ids
+    }
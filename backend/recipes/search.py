@@ -0,0 +1,165 @@
+import re
+import threading
+from collections import defaultdict
+
+from django.db import connection
+from django.db.models import Case, F, FloatField, Func, Value, When
+from django.db.models.expressions import RawSQL
+
+from recipes.fields import SEARCH_CONFIG
+from recipes.models import IngredientQuantity, Recipe
+
+SEARCH_VECTOR_SQL = f'''
+    setweight(to_tsvector('{SEARCH_CONFIG}', recipes_recipe.name), 'A')
+    || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce((
+        SELECT string_agg(ingredient.name, ' ')
+        FROM recipes_ingredientquantity line
+        JOIN recipes_ingredient ingredient
+            ON ingredient.id = line.ingredient_id
+        WHERE line.recipe_id = recipes_recipe.id
+    ), '')), 'B')
+    || setweight(to_tsvector('{SEARCH_CONFIG}', recipes_recipe.text), 'C')
+'''
+SEARCH_WEIGHTS = {'name': 1.0, 'ingredients': 0.4, 'text': 0.2}
+WORD_ENDINGS = sorted((
+    'иями', 'ями', 'ами', 'ией', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими',
+    'ая', 'яя', 'ое', 'ее', 'ие', 'ые', 'ой', 'ый', 'ий', 'ей', 'ом', 'ем',
+    'ам', 'ям', 'ах', 'ях', 'ою', 'ею', 'ов', 'ев', 'ия', 'ью',
+    'а', 'я', 'о', 'е', 'и', 'ы', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True)
+MIN_STEM_LENGTH = 3
+
+
+def use_search_vector():
+    return connection.vendor == 'postgresql'
+
+
+def stem(word):
+    for ending in WORD_ENDINGS:
+        if word.endswith(ending) and (
+            len(word) - len(ending) >= MIN_STEM_LENGTH
+        ):
+            return word[:-len(ending)]
+    return word
+
+
+def stems(text):
+    words = re.findall(r'\w+', text.lower().replace('ё', 'е'))
+    return {stem(word) for word in words}
+
+
+class RecipeSearchIndex:
+    """Обратный индекс рецептов в памяти процесса.
+
+    Используется вместо поискового вектора PostgreSQL на других базах
+    (например, SQLite в тестах): слова приводятся к основе упрощённым
+    отсечением окончаний, а вес совпадения зависит от поля, как у
+    setweight в базе.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built = False
+        self._postings = defaultdict(dict)
+        self._documents = {}
+
+    def _load(self, recipe_ids=None):
+        recipes = Recipe.objects.all()
+        lines = IngredientQuantity.objects.all()
+        if recipe_ids is not None:
+            recipes = recipes.filter(id__in=recipe_ids)
+            lines = lines.filter(recipe_id__in=recipe_ids)
+        ingredients = defaultdict(list)
+        for recipe_id, name in lines.values_list(
+            'recipe_id', 'ingredient__name'
+        ):
+            ingredients[recipe_id].append(name)
+        return {
+            pk: {
+                'name': name,
+                'ingredients': ' '.join(ingredients[pk]),
+                'text': text,
+            }
+            for pk, name, text in recipes.values_list('id', 'name', 'text')
+        }
+
+    def _remove(self, pk):
+        for word in self._documents.pop(pk, ()):
+            self._postings[word].pop(pk, None)
+
+    def _add(self, pk, fields):
+        weights = {}
+        for field, text in fields.items():
+            weight = SEARCH_WEIGHTS[field]
+            for word in stems(text):
+                weights[word] = max(weights.get(word, 0), weight)
+        for word, weight in weights.items():
+            self._postings[word][pk] = weight
+        self._documents[pk] = set(weights)
+
+    def _ensure_built(self):
+        if self._built:
+            return
+        with self._lock:
+            if not self._built:
+                for pk, fields in self._load().items():
+                    self._add(pk, fields)
+                self._built = True
+
+    def update(self, recipe_ids):
+        if not self._built:
+            return
+        recipe_ids = set(recipe_ids)
+        documents = self._load(recipe_ids)
+        with self._lock:
+            for pk in recipe_ids:
+                self._remove(pk)
+                if pk in documents:
+                    self._add(pk, documents[pk])
+
+    def search(self, query):
+        self._ensure_built()
+        words = stems(query)
+        if not words:
+            return []
+        with self._lock:
+            postings = [self._postings.get(word, {}) for word in words]
+            found = set.intersection(*(set(posting) for posting in postings))
+            scores = {
+                pk: sum(posting[pk] for posting in postings) for pk in found
+            }
+        return sorted(scores, key=lambda pk: (-scores[pk], -pk))
+
+
+search_index = RecipeSearchIndex()
+
+
+def update_search_vectors(recipe_ids):
+    if use_search_vector():
+        Recipe.objects.filter(id__in=recipe_ids).update(
+            search_vector=RawSQL(SEARCH_VECTOR_SQL, ())
+        )
+    else:
+        search_index.update(recipe_ids)
+
+
+def search_recipes(queryset, query):
+    if use_search_vector():
+        rank = Func(
+            F('search_vector'),
+            Func(
+                Value(SEARCH_CONFIG), Value(query),
+                function='websearch_to_tsquery'
+            ),
+            function='ts_rank',
+            output_field=FloatField()
+        )
+        return queryset.filter(search_vector__matches=query).annotate(
+            search_rank=rank
+        ).order_by('-search_rank', '-pub_date', '-id')
+    ranked = search_index.search(query)
+    if not ranked:
+        return queryset.none()
+    return queryset.filter(id__in=ranked).order_by(Case(
+        *(When(id=pk, then=position) for position, pk in enumerate(ranked))
+    ))
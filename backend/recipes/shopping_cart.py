@@ -0,0 +1,136 @@
+from array import array
+
+from django.core.cache import cache
+from django.db.models import Sum
+
+from recipes.cache import get_version
+from recipes.models import Ingredient, IngredientQuantity, ShoppingCart
+from recipes.personalization import get_recipe_ids
+
+SHOPPING_CART_CACHE_KEY = 'shopping_cart:{}:{}'
+RECIPE_LINES_CACHE_KEY = 'recipe_lines:{}:{}'
+SHOPPING_CART_CACHE_TIMEOUT = 60 * 60
+UNIT_CONVERSIONS = {
+    'кг': ('г', 1000),
+    'л': ('мл', 1000),
+    'шт': ('шт.', 1),
+}
+
+
+def shopping_cart_key(user_id):
+    return SHOPPING_CART_CACHE_KEY.format(user_id, get_version(Ingredient))
+
+
+def load_totals(recipe_ids):
+    amounts = dict(
+        IngredientQuantity.objects
+        .filter(recipe_id__in=recipe_ids)
+        .order_by()
+        .values_list('ingredient_id')
+        .annotate(amount=Sum('amount'))
+    )
+    return {
+        pk: [name, measurement_unit, amounts[pk]]
+        for pk, name, measurement_unit in (
+            Ingredient.objects
+            .filter(id__in=amounts)
+            .values_list('id', 'name', 'measurement_unit')
+        )
+    }
+
+
+def get_shopping_cart_state(user):
+    recipe_ids = get_recipe_ids(ShoppingCart, user).ids
+    key = shopping_cart_key(user.id)
+    state = cache.get(key)
+    if state is None or state['recipes'] != recipe_ids:
+        state = {'recipes': recipe_ids, 'totals': load_totals(recipe_ids)}
+        cache.set(key, state, SHOPPING_CART_CACHE_TIMEOUT)
+    return state
+
+
+def get_recipe_lines(recipe_ids):
+    version = get_version(Ingredient)
+    keys = {
+        pk: RECIPE_LINES_CACHE_KEY.format(pk, version) for pk in recipe_ids
+    }
+    cached = cache.get_many(keys.values())
+    lines = {pk: cached[key] for pk, key in keys.items() if key in cached}
+    missing = {pk: [] for pk in keys if pk not in lines}
+    if missing:
+        for recipe_id, *line in (
+            IngredientQuantity.objects
+            .filter(recipe_id__in=missing)
+            .values_list(
+                'recipe_id', 'ingredient_id', 'ingredient__name',
+                'ingredient__measurement_unit', 'amount'
+            )
+        ):
+            missing[recipe_id].append(line)
+        cache.set_many(
+            {keys[pk]: value for pk, value in missing.items()},
+            SHOPPING_CART_CACHE_TIMEOUT
+        )
+        lines.update(missing)
+    return lines
+
+
+def update_shopping_cart(user_id, recipe_ids, added):
+    key = shopping_cart_key(user_id)
+    state = cache.get(key)
+    if state is None:
+        return
+    recipes = set(state['recipes'])
+    changed = set(recipe_ids) - recipes if added else set(recipe_ids) & recipes
+    if not changed:
+        return
+    lines = get_recipe_lines(changed)
+    if not all(lines.values()):
+        cache.delete(key)
+        return
+    totals = state['totals']
+    sign = 1 if added else -1
+    for ingredient_id, name, measurement_unit, amount in (
+        line for recipe_lines in lines.values() for line in recipe_lines
+    ):
+        total = totals.setdefault(ingredient_id, [name, measurement_unit, 0])
+        total[2] += sign * amount
+        if total[2] <= 0:
+            del totals[ingredient_id]
+    state['recipes'] = array('I', sorted(recipes ^ changed))
+    cache.set(key, state, SHOPPING_CART_CACHE_TIMEOUT)
+
+
+def merge_units(totals):
+    merged = {}
+    for name, measurement_unit, amount in totals:
+        measurement_unit, factor = UNIT_CONVERSIONS.get(
+            measurement_unit, (measurement_unit, 1)
+        )
+        key = (name, measurement_unit)
+        merged[key] = merged.get(key, 0) + amount * factor
+    return sorted(
+        (name, measurement_unit, amount)
+        for (name, measurement_unit), amount in merged.items()
+    )
+
+
+def get_shopping_cart(user):
+    return merge_units(get_shopping_cart_state(user)['totals'].values())
+
+
+def invalidate_shopping_carts(user_ids):
+    cache.delete_many(
+        [shopping_cart_key(user_id) for user_id in user_ids]
+    )
+
+
+def invalidate_recipe_shopping_carts(recipe_id):
+    cache.delete(
+        RECIPE_LINES_CACHE_KEY.format(recipe_id, get_version(Ingredient))
+    )
+    invalidate_shopping_carts(
+        ShoppingCart.objects
+        .filter(recipe_id=recipe_id)
+        .values_list('user_id', flat=True)
+    )
@@ -0,0 +1,129 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.autocomplete import ingredient_index
+from recipes.cache import bump_version
+from recipes.counters import (deleting, update_recipe_counter,
+                              update_user_counter)
+from recipes.fragments import (invalidate_author_fragments,
+                               invalidate_recipe_fragments)
+from recipes.models import (Favorite, Ingredient, IngredientQuantity,
+                            Recipe, ShoppingCart, Tag)
+from recipes.matching import record_recipe_changes
+from recipes.personalization import invalidate_recipe_ids
+from recipes.search import update_search_vectors
+from recipes.shopping_cart import (invalidate_recipe_shopping_carts,
+                                   update_shopping_cart)
+from users.models import User
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def recipe_event_added(sender, instance, created, **kwargs):
+    if created:
+        update_recipe_counter(
+            sender, (instance.recipe_id,), 1, instance.added_at
+        )
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def recipe_event_removed(sender, instance, origin=None, **kwargs):
+    if not deleting(origin, Recipe):
+        update_recipe_counter(
+            sender, (instance.recipe_id,), -1, instance.added_at
+        )
+
+
+@receiver(post_save, sender=ShoppingCart)
+def shopping_cart_added(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: update_shopping_cart(
+            instance.user_id, (instance.recipe_id,), True
+        ))
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def shopping_cart_removed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: update_shopping_cart(
+        instance.user_id, (instance.recipe_id,), False
+    ))
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def user_recipes_changed(sender, instance, **kwargs):
+    transaction.on_commit(
+        lambda: invalidate_recipe_ids(sender, (instance.user_id,))
+    )
+
+
+@receiver(post_save, sender=IngredientQuantity)
+def ingredient_quantity_changed(sender, instance, **kwargs):
+    invalidate_recipe_shopping_carts(instance.recipe_id)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_changed(sender, instance, created, **kwargs):
+    if created:
+        update_user_counter('recipes_count', instance.author_id, 1)
+    else:
+        invalidate_recipe_shopping_carts(instance.id)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_fragment_changed(sender, instance, **kwargs):
+    transaction.on_commit(
+        lambda: invalidate_recipe_fragments((instance.id,))
+    )
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_search_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: update_search_vectors((instance.id,)))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    update_user_counter('recipes_count', instance.author_id, -1)
+    transaction.on_commit(lambda: record_recipe_changes((instance.id,)))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    recipe_ids = pk_set if reverse else (instance.id,)
+    if recipe_ids:
+        transaction.on_commit(
+            lambda: invalidate_recipe_fragments(list(recipe_ids))
+        )
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    if created or (update_fields and update_fields <= {'last_login'}):
+        return
+    transaction.on_commit(lambda: invalidate_author_fragments(instance.id))
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    ingredient_index.invalidate()
+    bump_version(Ingredient)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_renamed(sender, instance, created, **kwargs):
+    if created:
+        return
+    recipe_ids = IngredientQuantity.objects.filter(
+        ingredient_id=instance.id
+    ).values_list('recipe_id', flat=True)
+    transaction.on_commit(lambda: update_search_vectors(recipe_ids))
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(sender, **kwargs):
+    bump_version(Tag)
@@ -0,0 +1,212 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from recipes.cache import get_version
+from recipes.fragments import (get_fragments, get_recipe_versions,
+                               invalidate_recipe_fragments)
+from recipes.matching import current_sequence
+from recipes.models import (Favorite, Ingredient, IngredientQuantity, Recipe,
+                            ShoppingCart)
+from recipes.search import search_index
+from users.models import Follow, User
+
+
+class RecipeFragmentsTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_fragment_built_before_invalidation_is_not_served(self):
+        def build_stale(ids):
+            invalidate_recipe_fragments(ids)
+            return [{'id': pk, 'name': 'old'} for pk in ids]
+
+        def build_fresh(ids):
+            return [{'id': pk, 'name': 'new'} for pk in ids]
+
+        self.assertEqual(get_fragments([1], build_stale)[0]['name'], 'old')
+        self.assertEqual(get_fragments([1], build_fresh)[0]['name'], 'new')
+        self.assertEqual(get_fragments([1], build_stale)[0]['name'], 'new')
+
+
+class ImportRecipesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Имя', last_name='Фамилия', password='Password-12345'
+        )
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'recipes.json'
+
+    def import_recipes(self, lines, *args, **fields):
+        self.path.write_text(json.dumps([{
+            'author': 'author@example.com',
+            'name': 'Блины',
+            'text': 'Описание',
+            'cooking_time': 30,
+            'ingredients': [
+                {'name': name, 'measurement_unit': 'г', 'amount': amount}
+                for name, amount in lines.items()
+            ],
+            **fields,
+        }]), encoding='utf-8')
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command(
+                'import_data', '--recipes', str(self.path), *args,
+                stdout=StringIO()
+            )
+
+    def test_import_invalidates_recipe_caches(self):
+        ingredients_version = get_version(Ingredient)
+        sequence = current_sequence()
+        self.import_recipes({'мука': 100})
+        self.assertNotEqual(get_version(Ingredient), ingredients_version)
+        self.assertGreater(current_sequence(), sequence)
+
+        recipe = Recipe.objects.get()
+        recipe_version = get_recipe_versions([recipe.id])[recipe.id]
+        sequence = current_sequence()
+        self.import_recipes({'мука': 200}, '--update')
+        self.assertEqual(recipe.recipe_ingredient.get().amount, 200)
+        self.assertNotEqual(
+            get_recipe_versions([recipe.id])[recipe.id], recipe_version
+        )
+        self.assertGreater(current_sequence(), sequence)
+
+    def test_update_replaces_lines_and_keeps_image(self):
+        self.import_recipes(
+            {'мука': 100, 'сахар': 50}, image='recipes/old.png'
+        )
+        recipe = Recipe.objects.get()
+        Recipe.objects.filter(id=recipe.id).update(
+            image_thumbnail='recipes/thumbnail/old.webp',
+            image_medium='recipes/medium/old.webp'
+        )
+        self.import_recipes({'мука': 200, 'соль': 5}, '--update')
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image.name, 'recipes/old.png')
+        self.assertEqual(
+            recipe.image_thumbnail.name, 'recipes/thumbnail/old.webp'
+        )
+        self.assertEqual(
+            dict(recipe.recipe_ingredient.values_list(
+                'ingredient__name', 'amount'
+            )),
+            {'мука': 200, 'соль': 5}
+        )
+
+        self.import_recipes({'мука': 200}, '--update', image='recipes/new.png')
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image.name, 'recipes/new.png')
+        self.assertEqual(recipe.image_thumbnail.name, '')
+        self.assertEqual(recipe.image_medium.name, '')
+        self.assertEqual(recipe.recipe_ingredient.count(), 1)
+
+
+class IngredientQuantityAdminTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(
+            email='admin@example.com', username='admin',
+            first_name='Имя', last_name='Фамилия', password='Password-12345'
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.admin, name='Блины', text='Описание',
+            cooking_time=30, image='recipes/image.png'
+        )
+        self.line = IngredientQuantity.objects.create(
+            recipe=self.recipe, amount=100,
+            ingredient=Ingredient.objects.create(
+                name='мука', measurement_unit='г'
+            )
+        )
+        self.client.force_login(self.admin)
+
+    def admin_url(self, action):
+        return (
+            f'/admin/recipes/ingredientquantity/{self.line.id}/{action}/'
+        )
+
+    def assert_recipe_changed(self, request):
+        version = get_recipe_versions([self.recipe.id])[self.recipe.id]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = request()
+        self.assertEqual(response.status_code, 302)
+        self.assertNotEqual(
+            get_recipe_versions([self.recipe.id])[self.recipe.id], version
+        )
+
+    def test_admin_line_changes_refresh_recipe(self):
+        self.assert_recipe_changed(lambda: self.client.post(
+            self.admin_url('change'), {
+                'recipe': self.recipe.id,
+                'ingredient': self.line.ingredient_id,
+                'amount': 200,
+            }
+        ))
+        self.assertEqual(search_index.search('мука'), [self.recipe.id])
+        self.assert_recipe_changed(lambda: self.client.post(
+            self.admin_url('delete'), {'post': 'yes'}
+        ))
+        self.assertEqual(search_index.search('мука'), [])
+
+
+class CounterAdminTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin, self.author, self.reader = (
+            User.objects.create_superuser(
+                email=f'{name}@example.com', username=name,
+                first_name='Имя', last_name='Фамилия',
+                password='Password-12345'
+            )
+            for name in ('admin', 'author', 'reader')
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Блины', text='Описание',
+            cooking_time=30, image='recipes/image.png'
+        )
+        self.favorite = Favorite.objects.create(
+            user=self.reader, recipe=self.recipe
+        )
+        ShoppingCart.objects.create(user=self.reader, recipe=self.recipe)
+        Follow.objects.create(user=self.reader, following=self.author)
+        self.client.force_login(self.admin)
+
+    def delete(self, url):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/admin/{url}/delete/', {
+                'post': 'yes'
+            })
+        self.assertEqual(response.status_code, 302)
+
+    def assert_counters(self, recipes, followers, favorites, carts):
+        self.author.refresh_from_db()
+        self.assertEqual(
+            (self.author.recipes_count, self.author.followers_count),
+            (recipes, followers)
+        )
+        if recipes:
+            self.recipe.refresh_from_db()
+            self.assertEqual(
+                (self.recipe.favorites_count,
+                 self.recipe.shopping_cart_count),
+                (favorites, carts)
+            )
+            self.assertEqual(self.recipe.popularity_score > 0, bool(carts))
+
+    def test_admin_deletes_update_counters(self):
+        self.assert_counters(1, 1, 1, 1)
+        self.delete(f'recipes/favorite/{self.favorite.id}')
+        self.assert_counters(1, 1, 0, 1)
+        self.delete(f'users/user/{self.reader.id}')
+        self.assert_counters(1, 0, 0, 0)
+        self.delete(f'recipes/recipe/{self.recipe.id}')
+        self.assert_counters(0, 0, 0, 0)
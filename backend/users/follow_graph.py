@@ -0,0 +1,80 @@
+from array import array
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from recipes.personalization import IdSet
+from users.models import Follow
+
+FOLLOWING_CACHE_KEY = 'following:{}'
+FOLLOWING_CACHE_TIMEOUT = 60 * 60
+
+
+def get_following_ids(user):
+    if user.is_anonymous:
+        return IdSet(array('I'))
+    key = FOLLOWING_CACHE_KEY.format(user.id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = array('I', (
+            Follow.objects
+            .filter(user=user)
+            .order_by('following_id')
+            .values_list('following_id', flat=True)
+        ))
+        cache.set(key, ids, FOLLOWING_CACHE_TIMEOUT)
+    return IdSet(ids)
+
+
+def invalidate_following_ids(user_id):
+    cache.delete(FOLLOWING_CACHE_KEY.format(user_id))
+
+
+def is_subscribed(user, author_ids):
+    following = get_following_ids(user)
+    return {author_id: author_id in following for author_id in author_ids}
+
+
+def following_count(user):
+    return len(get_following_ids(user))
+
+
+def followers_count(user):
+    return user.followers_count
+
+
+def is_mutual(user, author):
+    return (
+        author.id in get_following_ids(user)
+        and user.id in get_following_ids(author)
+    )
+
+
+def mutual_follow_ids(user):
+    following = get_following_ids(user)
+    if not following:
+        return []
+    return list(
+        Follow.objects
+        .filter(following=user, user_id__in=following.ids)
+        .order_by('user_id')
+        .values_list('user_id', flat=True)
+    )
+
+
+def follow(user, author):
+    try:
+        with transaction.atomic():
+            subscription = Follow.objects.create(user=user, following=author)
+    except IntegrityError:
+        return None
+    return subscription
+
+
+def unfollow(user, author):
+    with transaction.atomic():
+        subscriptions = Follow.objects.filter(user=user, following=author)
+        if not list(subscriptions.select_for_update().values_list('id')):
+            return False
+        subscriptions.delete()
+    return True
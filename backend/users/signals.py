@@ -0,0 +1,24 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.counters import update_user_counter
+from users.follow_graph import invalidate_following_ids
+from users.models import Follow
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        update_user_counter('followers_count', instance.following_id, 1)
+        transaction.on_commit(
+            lambda: invalidate_following_ids(instance.user_id)
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    update_user_counter('followers_count', instance.following_id, -1)
+    transaction.on_commit(
+        lambda: invalidate_following_ids(instance.user_id)
+    )